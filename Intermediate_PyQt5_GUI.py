@@ -2,9 +2,17 @@
 More Advanced PyQt5 GUI Application
 '''
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox, QTableWidget, QTableWidgetItem, QDateEdit, QHeaderView, QHBoxLayout, QComboBox
-from PyQt5.QtCore import QDate, Qt
-import csv
+import os
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox, QTableWidget, QTableWidgetItem, QDateEdit, QHeaderView, QHBoxLayout, QTableView, QAbstractItemView, QFileDialog, QDialog, QPlainTextEdit, QDialogButtonBox
+from PyQt5.QtCore import QDate, Qt, QThreadPool, QTimer
+from array import array
+from person_table import PersonTableModel, TableSnapshot, LanguageDelegate, HEADERS, dob_to_text, text_to_dob
+from person_table import NAME_COLUMN, EMAIL_COLUMN, DOB_COLUMN, REMOTE_COLUMN, LANGUAGE_COLUMN
+from person_view import PersonProxyModel
+from person_validation import check_name, check_email
+from table_journal import TableJournal, replay
+from theme import apply_theme, style_table, BLUE_ROWS
+from instrumentation import timed, watch_event_loop
 
 '''
 QApplication - manages the GUI and needed for every PyQt App. ALWAYS import
@@ -19,68 +27,144 @@ QTableWidget - a table widget that lets you show data in rows and columns
 QTableWidgetItem - an item (cell) inside the table (text, icons, checkboxes)
 QDateEdit - a date input widget, allows selecting or typing a date
 QHeaderView - manages the headers of tables, supports resizing/stretching
-QComboBox - a dropdown menu widget for selecting one option from a list
+QTableView - a table view that draws rows from a model, only asking for the cells on screen
+QAbstractItemView - base class of table views, holds the edit trigger flags
+QFileDialog - standard dialogs for picking a file to open or a name to save as
+QDialog - base class for pop-up windows, used for the Batch Add window
+QPlainTextEdit - multi-line text box where many people can be pasted at once
+QDialogButtonBox - standard row of OK/Cancel style buttons
 QDate - represents a date (used to set default values or manipulate dates)
 Qt - contains enums and flags like ItemIsUserCheckable for checkboxes, alignment options
-csv - standard Python module for reading from and writing to CSV files
+QThreadPool - runs QRunnable tasks (like the CSV export) on worker threads
+QTimer - used to wait for a pause in typing before searching or checking the fields
+array - compact typed arrays from the standard library
+PersonTableModel - our model that keeps each column in a compact array (see person_table.py)
+PersonProxyModel - shows only the rows that match the search box (see person_view.py)
+check_name / check_email - precompiled rules for the input fields, return a message or None (see person_validation.py)
+LanguageDelegate - one shared delegate that shows a dropdown only while a Language cell is edited
+CsvExportTask - writes a table snapshot to CSV on a worker thread (see table_io.py)
+CsvImportTask - reads a CSV file on a worker thread and sends the rows back in batches
+BatchEntryTask - checks pasted text and dropped files on a worker thread
+SnapshotExportTask / SnapshotImportTask - the same for binary .pqts snapshots (see table_snapshot.py)
+    (these are imported where they are first used, so table_io and csv don't slow down the start)
+TableJournal - appends every change to a journal file so nothing is lost in a crash (see table_journal.py)
+apply_theme - sets the shared stylesheet and colors for the whole app (see theme.py)
+style_table - gives a table its colors through a palette instead of a stylesheet, which repaints faster
+timed / watch_event_loop - optional slot timing and hang detection, on with PYQT_INSTRUMENT=1 (see instrumentation.py)
 '''
 
 
+ENGINE_MODEL = "model"      # QTableView + PersonTableModel (default, scales to large tables)
+ENGINE_WIDGET = "widget"    # Original QTableWidget with one item per cell, kept for comparison
+MAX_LISTED_PROBLEMS = 10    # Invalid lines shown in the batch summary, the rest are only counted
+COMPACT_SECONDS = 300       # Fold the journal into table_data.csv every 5 minutes...
+COMPACT_ENTRIES = 10000     # ...or as soon as it holds this many entries
+VALIDATE_MS = 250           # Pause in typing before the name and email are checked
+
+
+def set_invalid(field, invalid):
+    # Turn the red "invalid" look of a field on or off (the rule for it is in theme.py).
+    # Qt only reads a property selector when the widget is polished, so polish it again, but only on a change.
+    if field.property("invalid") == invalid:
+        return
+    field.setProperty("invalid", invalid)
+    field.style().unpolish(field)
+    field.style().polish(field)
+
+
+def set_aside(path):
+    # Rename a file to "<name>.damaged" (".damaged2", ... if taken) so nothing is written over it; returns the new name
+    number = 1
+    target = path + ".damaged"
+    while os.path.exists(target):
+        number += 1
+        target = f"{path}.damaged{number}"
+    os.replace(path, target)
+    return target
+
+
+def dropped_files(event):
+    # Local file paths from a drag and drop event
+    return [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+
+
+# Pop-up window to paste many people at once or drop files onto
+class BatchEntryDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Batch Add")
+        self.setGeometry(550, 250, 500, 350)
+        self.filenames = []                     # Files dropped onto the dialog
+        self.setAcceptDrops(True)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("One person per line: Name, Email, MM/dd/yyyy[, Yes/No][, Language]\n"
+                                "Separate fields with commas or tabs, or drop CSV or .pqts files here."))
+        self.text_edit = QPlainTextEdit()
+        self.text_edit.setAcceptDrops(False)    # Let the dialog handle dropped files
+        layout.addWidget(self.text_edit)
+        self.files_label = QLabel("")
+        layout.addWidget(self.files_label)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText("Add All")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        self.filenames.extend(dropped_files(event))
+        self.files_label.setText("Files: " + ", ".join(os.path.basename(name) for name in self.filenames))
+
+
 # Base class for OOP approach, inherit from QWidget so we are a type of QWidget
 class PyQtApp(QWidget):
-    def __init__(self):
+    def __init__(self, engine=ENGINE_MODEL):
         super().__init__()
+        self.engine = engine                      # Which table engine to use (ENGINE_MODEL or ENGINE_WIDGET)
         self.setWindowTitle("PyQt Table App")     # App name
         self.setGeometry(500,200, 500, 400)     # Set size for our window (horizontal of widget on the screen, vertical of widget on the screen, width of widget, height of widget in pixels)
         
-        # Set background color of window
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f7f9fc;
-            }
-            QLabel {
-                color: #003366;
-                font-size: 14px;
-            }
-            QLineEdit, QDateEdit {
-                border: 2px solid #007BFF;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-            }
-            QPushButton {
-                background-color: #007BFF;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-            QTableWidget {
-                background-color: #cce0ff;  /* light blue base */
-                alternate-background-color:  #a7c8fa;  /* slightly darker light blue */
-                border: 2px solid #007BFF;
-                border-radius: 5px;
-                gridline-color: #dcdcdc;
-                font-size: 14px;
-                selection-background-color: #007BFF;
-                selection-color: white;
-            }
-            QHeaderView::section {
-                background-color: #007BFF;
-                color: white;
-                padding: 5px;
-                border: none;
-                font-weight: bold;
-            }
-        """
-        )
+        apply_theme()                           # Shared app-wide stylesheet, only applied by the first window (see theme.py)
         
         
-        self.init_ui()                          # Call our method to create the widgets and layout    
+        self.export_task = None                 # CSV export running in the background, if any
+        self.import_task = None                 # CSV import running in the background, if any
+        self.import_duplicates = 0              # Rows of that import left out because their email is already in the table
+        self.batch_task = None                  # Batch Add check running in the background, if any
+        self.widget_emails = {}                 # Widget engine only: lowercase email -> row, the model engine has its own
+        self.setAcceptDrops(True)               # CSV files can be dropped onto the window
+        self.init_ui()                          # Call our method to create the widgets and layout
+        watch_event_loop()                      # Logs GUI stalls when PYQT_INSTRUMENT=1, otherwise does nothing
+
+        # Model engine: every change goes to a journal, which is folded into the CSV now and then
+        self.journal = None
+        self.recovering = True                  # True while the last session is being loaded
+        self.unsaved_rows = False               # Imported rows that are in neither table_data.csv nor the journal
+        self.quit_when_saved = False            # Quit was clicked while imported rows still had to be saved
+        if self.model is not None:
+            self.journal = TableJournal()
+            self.model.journal = self.journal
+            self.compact_timer = QTimer(self)
+            self.compact_timer.timeout.connect(self.compact_journal)
+            self.compact_timer.start(COMPACT_SECONDS * 1000)
+
+        # Show the window first, the last session is loaded as soon as the event loop runs
+        # New rows would get mixed up with the ones being loaded, and the journal only starts writing afterwards
+        self.submit_button.setEnabled(False)
+        self.batch_button.setEnabled(False)     # Dropped files are ignored until then too, see dropEvent
+        QTimer.singleShot(0, self.restore_session)
+
+    def restore_session(self):
+        if os.path.exists("table_data.csv"):
+            self.load_table_from_csv()          # Reload the rows saved by the last session
+        else:
+            self.recover_journal()
 
     # Create all of our widgets and layout
     def init_ui(self):
@@ -104,6 +188,20 @@ class PyQtApp(QWidget):
         layout.addWidget(QLabel("Date of Birth: "))        # Label for date field
         layout.addWidget(self.dob_field)                   # Add date field to layout
 
+        # Problems with the fields are shown here instead of in a pop-up
+        self.error_label = QLabel("")
+        self.error_label.setObjectName("error_label")     # Red text, see theme.py
+        self.error_label.setWordWrap(True)
+        layout.addWidget(self.error_label)
+
+        # Check the name and email while typing, once the user stops for a moment
+        self.validate_timer = QTimer(self)
+        self.validate_timer.setSingleShot(True)
+        self.validate_timer.setInterval(VALIDATE_MS)
+        self.validate_timer.timeout.connect(self.validate_action)
+        self.name_field.textChanged.connect(self.validate_timer.start)   # Every key press restarts the timer
+        self.email_field.textChanged.connect(self.validate_timer.start)
+
         # Buttons in Horizontal Layout
         button_layout = QHBoxLayout()  # Create a vertical layout for buttons
 
@@ -111,114 +209,512 @@ class PyQtApp(QWidget):
         self.submit_button = QPushButton("Submit")
         self.submit_button.clicked.connect(self.submit_action)
 
+        # Batch Add Button
+        self.batch_button = QPushButton("Batch Add")
+        self.batch_button.clicked.connect(self.batch_action)  # Paste or drop many people at once
+
+        # Import Button
+        self.import_button = QPushButton("Import")
+        self.import_button.clicked.connect(self.import_action)  # Add rows from a CSV file or snapshot
+
+        # Export Button
+        self.export_button = QPushButton("Export")
+        self.export_button.clicked.connect(self.export_action)  # Save the table as a CSV file or snapshot
+
         # Quit Button
         self.quit_button = QPushButton("Quit")
         self.quit_button.clicked.connect(self.quit_action)  # Perform quit action when clicked
 
         button_layout.addWidget(self.submit_button)
+        button_layout.addWidget(self.batch_button)
+        button_layout.addWidget(self.import_button)
+        button_layout.addWidget(self.export_button)
         button_layout.addWidget(self.quit_button)
         layout.addLayout(button_layout)  # Add button layout to main layout
 
 
+        # Search box, filters the table by the start of a name, a surname or an email
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText("Search names or emails")
+        self.search_timer = QTimer(self)              # Waits for a short pause in typing
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.search_action)
+        self.search_field.textChanged.connect(self.search_timer.start)   # Every key press restarts the timer
+        layout.addWidget(self.search_field)
+
         # Table with columns
-        self.table = QTableWidget(0, 5)  # 0 rows, 5 column
-        self.table.setHorizontalHeaderLabels(["Names", "Email", "Date of Birth", "Remote", "Language"])  # Set the headers for each column
+        if self.engine == ENGINE_WIDGET:
+            self.model = None
+            self.proxy = None
+            self.table = QTableWidget(0, 5)  # 0 rows, 5 column
+            self.table.setHorizontalHeaderLabels(HEADERS)  # Set the headers for each column
+            self.search_field.hide()      # Searching needs the model engine's index
+        else:
+            self.model = PersonTableModel(self)   # Data lives in the model, one array per column
+            self.proxy = PersonProxyModel(self)   # Filtered view of the model
+            self.proxy.setSourceModel(self.model)
+            self.table = QTableView()
+            self.table.setModel(self.proxy)       # The view only asks for visible cells
+            self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)  # Start unsorted
+            self.table.setSortingEnabled(True)    # Click a header to sort by that column
+            self.table.verticalHeader().setDefaultSectionSize(30)  # Fixed row height so Qt never measures every row
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch) # Make columns stretch to fit the table width
+        self.language_delegate = LanguageDelegate(self.table)       # One delegate for the whole Language column
+        self.table.setItemDelegateForColumn(LANGUAGE_COLUMN, self.language_delegate)
+        self.table.setEditTriggers(self.table.editTriggers() | QAbstractItemView.SelectedClicked)  # Click a selected cell to edit it
         self.table.setAlternatingRowColors(True)  # Alternate row colors for better readability
+        style_table(self.table, BLUE_ROWS)        # Light blue rows without a stylesheet on the table
         layout.addWidget(self.table)
 
+        self.status_label = QLabel("")                # Shows background work like saving progress
+        layout.addWidget(self.status_label)
+
         self.setLayout(layout)                        # Need to associate the layout with the window
 
 
+    @timed
     def submit_action(self):
         name = self.name_field.text().strip()          # getter for text, then strip all white space from this string
         email = self.email_field.text().strip()
         birthday = self.dob_field.date().toString("MM/dd/yyyy")
 
-
-        if not (name and email and birthday):  # Check if all fields are filled
-            QMessageBox.warning(self, "Incomplete Input", "Please fill in all fields.")
+        self.validate_timer.stop()                      # Checked right here, no need to wait for the timer
+        problems = self.field_problems(name, email)
+        for field, value in ((self.name_field, name), (self.email_field, email)):
+            if not value:
+                problems.append((field, "Please fill in all fields."))   # Check if all fields are filled
+        if problems:
+            # Keep what was typed so it can be corrected
+            self.show_problems(problems)
+            problems[0][0].setFocus()
+            return
+
+        if self.model is not None:
+            # Model engine: append one entry to each column array
+            dob = self.dob_field.date().toJulianDay()
+            row = self.model.append_row(name, email, dob)
+            self.journal.record_add(row, name, email, dob)     # Autosaved within a second
+            self.compact_if_needed()
         else:
             # Add row to table
             row_position = self.table.rowCount()  # Get current number of rows
             self.table.insertRow(row_position)    # Insert a new row at the end
-            self.table.setItem(row_position, 0, QTableWidgetItem(name))      # Set name in first column
-            self.table.setItem(row_position, 1, QTableWidgetItem(email))     # Set email in second column
-            self.table.setItem(row_position, 2, QTableWidgetItem(birthday))  # Set birthday in third column
-
-            # Remote checkbox in fourth column
-            remote_item = QTableWidgetItem()        # Create an empty table item
-            remote_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)  # Make it checkable and enabled
-            remote_item.setCheckState(Qt.Unchecked)  # Default to unchecked
-            self.table.setItem(row_position, 3, remote_item)  # Add checkbox to fourth column
-
-            # Language ComboBox in fifth column (Dropdown menu)
-            language_combo = QComboBox()  # Create a combo box
-            language_combo.addItems(["English", "Spanish", "French", "German", "Chinese", "Japanese"])  # Add language options
-            language_combo.setCurrentIndex(0)  # Set default to first language
-            self.table.setItem(row_position, 4, QTableWidgetItem())  # Placeholder item for the combo box
-            self.table.setCellWidget(row_position, 4, language_combo)  # Set the combo box as the cell widget
+            self.set_widget_row(row_position, name, email, birthday)
 
 
         # Clear input fields after submission
         self.name_field.clear()
         self.email_field.clear()
         self.dob_field.setDate(QDate.currentDate())  # reset safely to today
+        self.validate_timer.stop()                   # Clearing the fields started it again
+        self.show_problems([])
 
 
         self.name_field.setFocus()  # Set focus back to the name field for convenience    
 
+    def field_problems(self, name, email):
+        # (field, message) for every filled-in field that breaks a rule; never looks at the rows one by one
+        problems = []
+        if name:
+            message = check_name(name)
+            if message:
+                problems.append((self.name_field, message))
+        if email:
+            message = check_email(email) or self.duplicate_email(email)
+            if message:
+                problems.append((self.email_field, message))
+        return problems
+
+    def duplicate_email(self, email):
+        if self.model is not None:
+            row = self.model.find_email(email)             # One dict lookup in the model's email index
+        else:
+            row = self.widget_emails.get(email.casefold())
+        return None if row is None else f"{email} is already in the table."
+
+    def show_problems(self, problems):
+        # Mark the fields with problems and list the messages under them, the other fields go back to normal
+        for field in (self.name_field, self.email_field):
+            set_invalid(field, any(field is bad for bad, _ in problems))
+        self.error_label.setText("\n".join(dict.fromkeys(message for _, message in problems)))   # Each message once
+
+    @timed
+    def validate_action(self):
+        # Empty fields are not marked while typing, only when Submit is clicked
+        self.show_problems(self.field_problems(self.name_field.text().strip(), self.email_field.text().strip()))
+
+    @timed
+    def search_action(self):
+        self.proxy.set_filter_text(self.search_field.text())   # Looks the text up in the prefix index
+
+    def set_widget_row(self, row_position, name, email, birthday, remote=0, language=0):
+        # Widget engine only: fill one existing row with items
+        self.table.setItem(row_position, 0, QTableWidgetItem(name))      # Set name in first column
+        self.table.setItem(row_position, 1, QTableWidgetItem(email))     # Set email in second column
+        self.widget_emails[email.casefold()] = row_position             # For the duplicate check in submit_action
+        self.table.setItem(row_position, 2, QTableWidgetItem(birthday))  # Set birthday in third column
+
+        # Remote checkbox in fourth column
+        remote_item = QTableWidgetItem()        # Create an empty table item
+        remote_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)  # Make it checkable and enabled
+        remote_item.setCheckState(Qt.Checked if remote else Qt.Unchecked)  # Unchecked unless the row says remote
+        self.table.setItem(row_position, 3, remote_item)  # Add checkbox to fourth column
+
+        # Language code in fifth column, the LanguageDelegate shows it as a dropdown while editing
+        language_item = QTableWidgetItem()
+        language_item.setData(Qt.EditRole, language)  # Store the language code, not a widget
+        self.table.setItem(row_position, LANGUAGE_COLUMN, language_item)
+
+    def load_table_from_csv(self, filename="table_data.csv"):
+        # Parse the file on a worker thread, the GUI thread only adds the finished batches
+        from table_io import CsvImportTask      # Imported on first use, see the top of the file
+        return self.start_import(CsvImportTask(filename, first_row=self.row_count()), filename)
+
+    def load_table_from_snapshot(self, filename="table_data.pqts"):
+        # The worker maps the snapshot into memory and hands the columns over in the same batches
+        from table_snapshot import SnapshotImportTask
+        return self.start_import(SnapshotImportTask(filename, first_row=self.row_count()), filename)
+
+    def row_count(self):
+        # Rows in the table, for the model engine the whole table, not just the rows the search shows
+        return self.model.rowCount() if self.model is not None else self.table.rowCount()
+
+    def start_import(self, task, filename):
+        task.signals.batch_ready.connect(self.import_batch)
+        task.signals.finished.connect(self.import_finished)
+        task.signals.failed.connect(self.import_failed)
+        task.signals.cancelled.connect(self.import_done)
+        self.import_task = task
+        self.import_duplicates = 0
+        self.import_button.setEnabled(False)
+        self.status_label.setText(f"Loading {os.path.basename(filename)}...")
+        QThreadPool.globalInstance().start(task)
+        return task
+
+    def import_action(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Import", "", "Tables (*.csv *.pqts);;CSV Files (*.csv);;Table Snapshots (*.pqts)")
+        if filename.lower().endswith(".pqts"):
+            self.load_table_from_snapshot(filename)
+        elif filename:
+            self.load_table_from_csv(filename)
+
+    def import_batch(self, batch):
+        if not self.recovering:                     # The last session's own rows are added unchecked
+            batch, duplicates = self.without_known_emails(batch)
+            self.import_duplicates += len(duplicates)
+        first = self.row_count()
+        self.add_batch(batch)
+        if not self.recovering and len(batch):
+            self.unsaved_rows = True                # Not journaled, only the next compaction saves them
+            if self.journal is not None:
+                self.journal.record_import(first, len(batch))   # Lets replay number later changes right after a crash
+
+    @timed
+    def add_batch(self, batch):
+        if self.model is not None:
+            self.model.append_columns(batch)        # One beginInsertRows for the whole batch
+            return
+
+        # Widget engine: grow the table once and stop repainting until all items are set
+        self.table.setUpdatesEnabled(False)
+        first = self.table.rowCount()
+        self.table.setRowCount(first + len(batch))
+        for offset in range(len(batch)):
+            self.set_widget_row(first + offset, batch.names[offset], batch.emails[offset],
+                                dob_to_text(batch.dobs[offset]), batch.remote[offset], batch.languages[offset])
+        self.table.setUpdatesEnabled(True)
+
+    def import_done(self):
+        self.import_task = None
+        self.import_button.setEnabled(True)
+        self.status_label.setText("")
+
+    def import_finished(self, loaded, skipped):
+        self.import_done()
+        message = f"Loaded {loaded - self.import_duplicates} rows."
+        if skipped:
+            message += f" Skipped {skipped} invalid rows."
+        if self.import_duplicates:
+            message += f" Skipped {self.import_duplicates} rows with an email already in the table."
+        self.status_label.setText(message)
+        if self.recovering:
+            self.recover_journal()              # Replay the changes made after the CSV was written
+        else:
+            self.compact_journal()              # Imported rows are not in the journal, save them in the CSV
+
+    def recover_journal(self):
+        self.recovering = False
+        self.submit_button.setEnabled(True)
+        self.batch_button.setEnabled(True)
+        if self.journal is None:
+            return
+        entries = self.journal.read_entries()
+        applied = replay(self.model, entries)
+        self.journal.start()                    # Background thread that writes new entries every second
+        if applied:
+            self.status_label.setText(f"Recovered {applied} unsaved changes.")
+        if entries:
+            self.compact_journal()
+
+    def import_failed(self, message):
+        self.import_done()
+        if self.recovering:
+            self.session_load_failed(message)
+            return
+        QMessageBox.warning(self, "Import Failed", f"Could not load the file:\n{message}")
+
+    def session_load_failed(self, message):
+        # Only part of table_data.csv was read. Autosave would write that part over the whole file, and the
+        # journal's row numbers refer to the whole file, so move both out of the way before anything is saved.
+        paths = ["table_data.csv"]
+        if self.journal is not None:
+            paths += [self.journal.compacting_path, self.journal.path]
+        kept = [set_aside(path) for path in paths if os.path.exists(path)]
+        self.recover_journal()                  # Nothing left to replay, starts an empty journal
+        loaded = self.row_count()
+        if loaded and self.journal is not None:
+            self.unsaved_rows = True            # Start the new table_data.csv with the rows that could be read
+            self.journal.record_import(0, loaded)
+            self.compact_journal()
+        QMessageBox.warning(self, "Last Session Not Loaded",
+                            f"Could not load the last session:\n{message}\n\n"
+                            f"{loaded} rows were loaded. The files were kept unchanged as:\n" + "\n".join(kept))
+
+    def batch_action(self):
+        dialog = BatchEntryDialog(self)
+        if dialog.exec() == QDialog.Accepted:
+            self.run_batch(dialog.text_edit.toPlainText(), dialog.filenames)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls() and not self.recovering:
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        filenames = dropped_files(event)
+        if filenames and not self.recovering:   # Same as the disabled Batch Add button while the session loads
+            self.run_batch("", filenames)
+
+    def run_batch(self, text, filenames):
+        if not text.strip() and not filenames:
+            return
+        # Check every record on a worker, then add them all at once
+        from table_io import BatchEntryTask     # Imported on first use, see the top of the file
+        task = BatchEntryTask(text, filenames, self.row_count())
+        task.signals.finished.connect(self.batch_finished)
+        task.signals.failed.connect(self.batch_failed)
+        self.batch_task = task
+        self.batch_button.setEnabled(False)
+        self.status_label.setText("Checking records...")
+        QThreadPool.globalInstance().start(task)
+
+    @timed
+    def batch_finished(self, batch, problems, lines):
+        self.batch_task = None
+        self.batch_button.setEnabled(True)
+        self.status_label.setText("")
+        batch, duplicates = self.without_known_emails(batch)
+        problems = problems + [f"{lines[row]} - {message}" for row, message in duplicates]
+        first = self.row_count()                    # Row number of the first new person
+        self.add_batch(batch)                       # One bulk insert and one layout change for all rows
+        if self.journal is not None:
+            for offset in range(len(batch)):
+                self.journal.record_add(first + offset, batch.names[offset], batch.emails[offset],
+                                        batch.dobs[offset], batch.remote[offset], batch.languages[offset])
+            self.compact_if_needed()
+
+        message = f"Added {len(batch)} people."
+        if problems:
+            message += f"\n\nSkipped {len(problems)} invalid lines:\n" + "\n".join(problems[:MAX_LISTED_PROBLEMS])
+            if len(problems) > MAX_LISTED_PROBLEMS:
+                message += f"\n...and {len(problems) - MAX_LISTED_PROBLEMS} more"
+        QMessageBox.information(self, "Batch Add", message)     # One summary instead of a popup per row
+
+    def without_known_emails(self, batch):
+        # Leave out rows whose email is already in the table or earlier in the batch; returns the batch and
+        # (row, message) for every row left out. One dict lookup per row, done here on the GUI thread
+        # because rows may have been added while the worker was reading the batch.
+        keep, problems, seen = [], [], set()
+        for row, email in enumerate(batch.emails):
+            key = email.strip().casefold()
+            message = self.duplicate_email(email) or (f"{email} is already in the table." if key in seen else None)
+            if message:
+                problems.append((row, message))
+            else:
+                keep.append(row)
+                seen.add(key)
+        if not problems:
+            return batch, problems
+        return TableSnapshot([batch.names[row] for row in keep], [batch.emails[row] for row in keep],
+                             array("i", (batch.dobs[row] for row in keep)), bytes(batch.remote[row] for row in keep),
+                             bytes(batch.languages[row] for row in keep)), problems   # The model indexes these rows itself
+
+    def batch_failed(self, message):
+        self.batch_task = None
+        self.batch_button.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.warning(self, "Batch Add Failed", f"Could not read the records:\n{message}")
+
+    def take_snapshot(self):
+        if self.model is not None:
+            return self.model.snapshot()            # Model engine: cheap copy of the column arrays
+
+        # Widget engine: read every cell on the GUI thread, the widgets can't be touched from a worker
+        names, emails, dobs, remote, languages = [], [], array("i"), bytearray(), bytearray()
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, NAME_COLUMN)
+            names.append(item.text() if item is not None else "")
+            item = self.table.item(row, EMAIL_COLUMN)
+            emails.append(item.text() if item is not None else "")
+            item = self.table.item(row, DOB_COLUMN)
+            dobs.append((text_to_dob(item.text()) if item is not None else None) or 0)   # A cell that isn't a date becomes 0, written as an empty date
+
+            item = self.table.item(row, REMOTE_COLUMN)  # Get the QTableWidgetItem from this cell
+            # Check if the checkbox is checked; an empty cell counts as not checked
+            remote.append(1 if item is not None and item.checkState() == Qt.Checked else 0)
+
+            item = self.table.item(row, LANGUAGE_COLUMN)  # Get the QTableWidgetItem holding the language code
+            code = item.data(Qt.EditRole) if item is not None else None
+            languages.append(code if isinstance(code, int) else 0)
+        return TableSnapshot(names, emails, dobs, bytes(remote), bytes(languages))
+
+    @timed
     def save_table_to_csv(self, filename="table_data.csv"):
-        row_count = self.table.rowCount()           # Get the total number of rows in the table
-        col_count = self.table.columnCount()        # Get the total number of columns in the table
-
-        # Open a CSV file for writing. 'w' mode overwrites the file if it exists.
-        # 'newline=""' prevents extra blank lines between rows on some systems.
-        # 'encoding="utf-8"' ensures proper handling of non-English characters.
-        with open(filename, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)               # Create a CSV writer object to write rows to the file
-
-            # Write the table headers as the first row in the CSV
-            headers = [self.table.horizontalHeaderItem(col).text() for col in range(col_count)]
-            # Loop through all columns, get each header's text, and store in a list
-            writer.writerow(headers)                # Write the header row to the CSV
-
-            # Loop through each row in the table to write its data
-            for row in range(row_count):
-                row_data = []                        # Initialize a list to hold the current row's data
-
-                # Loop through each column in the current row
-                for col in range(col_count):
-
-                    if col == 3:  # Remote checkbox column
-                        item = self.table.item(row, col)  # Get the QTableWidgetItem from this cell
-                        if item is not None:
-                            # Check if the checkbox is checked; write "Yes" if checked, "No" otherwise
-                            row_data.append("Yes" if item.checkState() == Qt.Checked else "No")
-                        else:
-                            row_data.append("No")  # If the cell is empty, default to "No"
-
-                    elif col == 4:  # Language ComboBox column
-                        combo = self.table.cellWidget(row, col)  # Get the QComboBox widget from this cell
-                        if combo is not None:
-                            row_data.append(combo.currentText())  # Save the currently selected language
-                        else:
-                            row_data.append("")  # If no combo box exists, leave blank
-
-                    else:
-                        # For normal text cells (Name, Email, Date of Birth)
-                        item = self.table.item(row, col)  # Get the QTableWidgetItem
-                        # Append its text if it exists; otherwise, append an empty string
-                        row_data.append(item.text() if item is not None else "")
-
-                # After processing all columns, write the row data to the CSV
-                writer.writerow(row_data)
-
+        # Copy the data now, then write it on a worker thread so the window stays responsive.
+        # The file is written to a temporary name and renamed at the end, so it is never left half-written.
+        from table_io import CsvExportTask      # Imported on first use, see the top of the file
+        return self.start_export(CsvExportTask(filename, self.take_snapshot()))
+
+    @timed
+    def save_table_to_snapshot(self, filename="table_data.pqts"):
+        # Same as save_table_to_csv, but writes the columns as a binary snapshot (see table_snapshot.py)
+        from table_snapshot import SnapshotExportTask
+        return self.start_export(SnapshotExportTask(filename, self.take_snapshot()))
+
+    def start_export(self, task):
+        task.signals.progress.connect(self.export_progress)
+        self.export_task = task                     # Keep a reference so the task can be cancelled
+        QThreadPool.globalInstance().start(task)
+        return task
+
+    def export_progress(self, written, total):
+        self.status_label.setText(f"Saving... {written}/{total} rows")
+
+    def export_action(self):
+        if self.export_task is not None or self.import_task is not None:
+            self.status_label.setText("Please wait until the current load or save is done.")
+            return
+        filename, chosen = QFileDialog.getSaveFileName(self, "Export", "table_data.pqts",
+                                                       "Table Snapshots (*.pqts);;CSV Files (*.csv)")
+        if not filename:
+            return
+        if not os.path.splitext(filename)[1]:
+            filename += ".csv" if chosen.startswith("CSV") else ".pqts"     # Not every platform adds it
+        if filename.lower().endswith(".csv"):
+            task = self.save_table_to_csv(filename)
+        else:
+            task = self.save_table_to_snapshot(filename)
+        task.signals.finished.connect(self.export_saved)
+        task.signals.failed.connect(self.export_failed)
+        task.signals.cancelled.connect(self.export_cancelled)
+
+    def export_saved(self, filename):
+        self.export_done()
+        self.status_label.setText(f"Saved {os.path.basename(filename)}.")
+
+    def compact_if_needed(self):
+        if self.journal.entries >= COMPACT_ENTRIES:
+            self.compact_journal()
+
+    def compact_journal(self):
+        # Save the whole table as the CSV snapshot in the background and start an empty journal
+        if self.journal is None or self.export_task is not None or self.import_task is not None or self.recovering:
+            return
+        if not (self.journal.entries or self.unsaved_rows):
+            return                                  # Nothing changed since the last snapshot
+        self.journal.rotate()                       # Same moment as the snapshot below
+        self.unsaved_rows = False                   # The snapshot below holds the imported rows
+        task = self.save_table_to_csv()
+        task.signals.finished.connect(self.compaction_finished)
+        task.signals.failed.connect(self.compaction_failed)
+        task.signals.cancelled.connect(self.compaction_failed)
+
+    def compaction_finished(self, filename):
+        self.export_task = None
+        self.journal.compaction_done()
+        self.status_label.setText("All changes saved.")
+        self.save_waiting_rows()
+
+    def compaction_failed(self, message=""):
+        self.export_task = None                     # The rotated journal is kept and replayed if needed
+        self.unsaved_rows = True                    # Imported rows may have been in this snapshot, try again
+        self.quit_when_saved = False
+        self.status_label.setText("Autosave snapshot failed, changes are still in the journal.")
+
+    def save_waiting_rows(self):
+        # A save just finished; rows imported while it ran could not be saved until now
+        if self.quit_when_saved:
+            self.quit_action()
+        elif self.unsaved_rows:
+            self.compact_journal()
+
+    def closeEvent(self, event):
+        if self.journal is not None and self.import_task is None and (self.unsaved_rows or self.export_task is not None):
+            event.ignore()                          # Same as the Quit button: the window closes once the rows are saved
+            self.quit_action()
+            return
+        if self.journal is not None:
+            self.journal.close()                    # Write the last entries before the window goes away
+        super().closeEvent(event)
 
     def quit_action(self):
-        self.save_table_to_csv()  # Save table data to CSV before quitting
+        if self.journal is not None and self.import_task is None:
+            if self.unsaved_rows or self.export_task is not None:
+                # Imported rows are only in memory until a snapshot holds them, quit once it is written
+                self.quit_when_saved = True
+                self.status_label.setText("Saving imported rows before quitting...")
+                self.compact_journal()              # Does nothing while another save runs, export_done calls back
+                return
+            # Model engine: everything else is already in the journal, only the last second needs writing
+            self.journal.close()
+            QApplication.quit()       # Quit the application
+            return
+
+        if self.import_task is not None:
+            # Saving now would overwrite the file with only part of its rows
+            self.status_label.setText("Still loading, please wait before quitting.")
+            return
+
+        if self.export_task is not None:
+            self.export_task.cancel()               # Second click while saving cancels the save
+            return
+
+        task = self.save_table_to_csv()             # Save table data to CSV before quitting
+        task.signals.finished.connect(self.export_finished)
+        task.signals.failed.connect(self.export_failed)
+        task.signals.cancelled.connect(self.export_cancelled)
+        self.submit_button.setEnabled(False)        # No new rows while the snapshot is being saved
+        self.quit_button.setText("Cancel Save")
+
+    def export_done(self):
+        self.export_task = None
+        self.submit_button.setEnabled(True)
+        self.quit_button.setText("Quit")
+        self.save_waiting_rows()
+
+    def export_finished(self, filename):
+        self.export_done()
         QApplication.quit()       # Quit the application
 
+    def export_failed(self, message):
+        self.export_done()
+        self.status_label.setText("Save failed.")
+        QMessageBox.warning(self, "Save Failed", f"Could not save the table:\n{message}")
+
+    def export_cancelled(self):
+        self.export_done()
+        self.status_label.setText("Save cancelled, the previous file was kept.")
+
 
 
 
@@ -226,6 +722,7 @@ class PyQtApp(QWidget):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)                    # Initializes application
-    window = PyQtApp()                              # Create instance of our class
+    engine = ENGINE_WIDGET if "--widget" in sys.argv else ENGINE_MODEL   # Pass --widget to compare against the old engine
+    window = PyQtApp(engine)                        # Create instance of our class
     window.show()                                   # Show method to run app
     sys.exit(app.exec())                            # sys.exit to exit app
\ No newline at end of file
@@ -2,7 +2,10 @@
 Simple PyQt5 app with a table to display submitted names.
 '''
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox, QTableWidget, QTableWidgetItem
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QTableView, QHeaderView
+from PyQt5.QtCore import QTimer
+from theme import apply_theme, style_table
+from name_list import NameListModel
 
 '''
 QApplication - manages the GUI and needed for every PyQt App. ALWAYS import
@@ -11,12 +14,18 @@ QLabel - display static text
 QLineEdit - Text input/entry
 QPushButton - clickable putton
 QVBoxLayout - layour mmanagement and arranges widgets vertically
-QMessageBox - Pop up box to give users info
-QTableWidget - a table widget that lets you show data in rows and columns
-QTableWidgetItem - an item (cell) inside the table (text, icons, etc.)
+QTableView - a table that draws rows from a model, only asking for the rows on screen
+QHeaderView - manages the headers of tables, supports resizing/stretching
+QTimer - clears the status message after a few seconds
+apply_theme - sets the shared stylesheet and colors for the whole app (see theme.py)
+style_table - gives a table its colors through a palette instead of a stylesheet, which repaints faster
+NameListModel - keeps every name once and finds duplicates instantly (see name_list.py)
 '''
 
 
+STATUS_SECONDS = 3          # How long a status message stays under the table
+
+
 # Base class for OOP approach, inherit from QWidget so we are a type of QWidget
 class PyQtApp(QWidget):
     def __init__(self):
@@ -24,50 +33,7 @@ class PyQtApp(QWidget):
         self.setWindowTitle("PyQt Table App")     # App name
         self.setGeometry(100,100, 400, 200)     # Set size for our window (horizontal of widget on the screen, vertical of widget on the screen, width of widget, height of widget in pixels)
         
-        # Set background color of window
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f7f9fc;
-            }
-            QLabel {
-                color: #003366;
-                font-size: 14px;
-            }
-            QLineEdit {
-                border: 2px solid #007BFF;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-            }
-            QPushButton {
-                background-color: #007BFF;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-            QTableWidget {
-                background-color: white;
-                border: 2px solid #007BFF;
-                border-radius: 5px;
-                gridline-color: #dcdcdc;
-                font-size: 14px;
-                selection-background-color: #007BFF;
-                selection-color: white;
-            }
-            QHeaderView::section {
-                background-color: #007BFF;
-                color: white;
-                padding: 5px;
-                border: none;
-                font-weight: bold;
-            }
-        """
-        )
+        apply_theme()                           # Shared app-wide stylesheet, only applied by the first window (see theme.py)
         
         
         self.init_ui()                          # Call our method to create the widgets and layout    
@@ -95,29 +61,38 @@ class PyQtApp(QWidget):
         layout.addWidget(self.quit_button)
 
         # Table to show submitted names
-        self.table = QTableWidget(0, 1)  # 0 rows, 1 column
-        self.table.setHorizontalHeaderLabels(["Names"])
+        self.model = NameListModel()     # The names themselves, one column
+        self.table = QTableView()
+        self.table.setModel(self.model)  # The view only asks for visible rows
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)   # Names column fills the width
+        self.table.verticalHeader().setDefaultSectionSize(30)  # Fixed row height so Qt never measures every row
+        style_table(self.table)          # White rows, blue selection
         layout.addWidget(self.table)
 
+        # Status line instead of pop ups, so typing the next name can start right away
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        self.status_timer = QTimer(self)
+        self.status_timer.setSingleShot(True)
+        self.status_timer.timeout.connect(self.status_label.clear)
+
         self.setLayout(layout)                        # Need to associate the layout with the window
 
 
     def submit_action(self):
         user_input = self.text_field.text().strip()          # getter for text, then strip all white space from this string
-        if user_input:
-            # Add the name to the table
-            row_position = self.table.rowCount()
-            self.table.insertRow(row_position)
-            self.table.setItem(row_position, 0, QTableWidgetItem(user_input))
-            
-            # Show confirmation popup
-            QMessageBox.information(self, "Success", "Successfully submitted")
-
-            # Clear the input field after submission
-            self.text_field.clear()  
+        if not user_input:
+            self.show_status("Please enter your name.")     # Warning if user puts no input
+        elif self.model.add_name(user_input):               # Add the name to the table, False if it is already there
+            self.table.scrollToBottom()
+            self.show_status("Successfully submitted")
+            self.text_field.clear()                         # Clear the input field after submission
         else:
-            # Warning if user puts no input
-            QMessageBox.warning(self, "No Input", "Please enter your name.")      
+            self.show_status(f"{user_input} is already in the table.")
+
+    def show_status(self, message):
+        self.status_label.setText(message)
+        self.status_timer.start(STATUS_SECONDS * 1000)      # Starts over if a message is already showing
 
 
 
@@ -5,6 +5,7 @@
 
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox
+from theme import apply_theme
 
 '''
 QApplication - manages the GUI and needed for every PyQt App. ALWAYS import
@@ -14,6 +15,7 @@ QLineEdit - Text input/entry
 QPushButton - clickable putton
 QVBoxLayout - layour mmanagement and arranges widgets vertically
 QMessageBox - Pop up box to give users info
+apply_theme - sets the shared stylesheet and colors for the whole app (see theme.py)
 '''
 
 
@@ -24,34 +26,7 @@ class PyQtApp(QWidget):
         self.setWindowTitle("OOP PyQt App")     # App name
         self.setGeometry(100,100, 400, 200)     # Set size for our window (horizontal of widget on the screen, vertical of widget on the screen, width of widget, height of widget in pixels)
         
-        # Set background color of window
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f7f9fc;
-            }
-            QLabel {
-                color: #003366;
-                font-size: 14px;
-            }
-            QLineEdit {
-                border: 2px solid #007BFF;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-            }
-            QPushButton {
-                background-color: #007BFF;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-        """
-        )
+        apply_theme()                           # Shared app-wide stylesheet, only applied by the first window (see theme.py)
         
         
         self.init_ui()                          # Call our method to create the widgets and layout    
@@ -1,15 +1,22 @@
-import cv2 # OpenCV library for image processing
-import time    # Library for time-related functions
 import sys     # System-specific parameters and functions
-from pyzbar.pyzbar import decode  # Library for decoding barcodes and QR codes
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QPushButton
+import os      # os.cpu_count() limits the decoder process pool
+import argparse  # Reads the decode options from the command line
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton
 from PyQt5.QtCore import QTimer
+from scanner_pipeline import ScannerPipeline, RegionDecoder, decode_frame  # Capture, decode and display threads (see scanner_pipeline.py)
+from frame_preview import FramePreview  # Live video drawn inside this window (see frame_preview.py)
+from frame_sources import CameraSource, VideoFileSource, ImageFolderSource  # Where frames come from (see frame_sources.py)
+from scanner_codes import CodeDeduplicator, UsedCodeStore, NEW, USED  # Used codes and a recently-seen window (see scanner_codes.py)
+from instrumentation import timed, watch_event_loop  # Optional slot timing and hang detection, on with PYQT_INSTRUMENT=1
 
 # img = cv2.imread('tutorial.png')     # This is how you read images from a file
 
 class ScannerApp(QWidget):
-    def __init__(self):
+    def __init__(self, decoder=None, sources=None, processes=0):
         super().__init__()
+        self.sources = sources or [CameraSource(0, 640, 480)]   # Webcam 0 at 640x480 unless other sources are given
+        self.processes = processes      # Decoder processes shared by all cameras, 0 decodes on threads
+        self.decoder = decoder or RegionDecoder()   # Grayscale, shrunken first pass, full resolution only around codes
         self.setWindowTitle("QR and Barcode Scanner")  # Set the window title
         self.setGeometry(200, 200, 500, 400)           # Set the window size and position
 
@@ -32,61 +39,138 @@ class ScannerApp(QWidget):
         self.layout.addWidget(self.stop_button)
         self.stop_button.setEnabled(False)  # Disable stop button initially
 
+        # Live video, one preview per camera, side by side
+        preview_layout = QHBoxLayout()
+        self.previews = []
+        for number in range(len(self.sources)):
+            preview = FramePreview(lambda number=number: self.pipeline.latest_frame(number) if self.pipeline else None)
+            preview_layout.addWidget(preview)
+            self.previews.append(preview)
+        self.layout.addLayout(preview_layout)
+
+        # One line per camera with its latest result and statistics
+        self.camera_labels = []
+        if len(self.sources) > 1:
+            for number in range(len(self.sources)):
+                label = QLabel(f"Camera {number}: idle")
+                self.layout.addWidget(label)
+                self.camera_labels.append(label)
+        self.camera_messages = ["idle"] * len(self.sources)
+        self.failed_cameras = set()
+        self.stats_timer = QTimer()         # Refreshes the per-camera statistics
+        self.stats_timer.timeout.connect(self.update_stats)
+
         # Camera setup
-        self.cap = None                 # Camera capture object
-        self.timer = QTimer()           # Timer to control frame capture
-        self.timer.timeout.connect(self.scan_frame)  # Connect timer to scan_frame method
-        self.used_codes = []            # List to store already used QR codes
+        self.pipeline = None            # Worker threads that capture, decode and show frames
+        self.used_codes = UsedCodeStore()   # Redeemed codes saved in used_codes.db, kept across restarts
+        self.codes = CodeDeduplicator(used_codes=self.used_codes)  # Reports a code held in view only once
+        self.flush_timer = QTimer()         # Writes newly used codes to disk in batches
+        self.flush_timer.timeout.connect(self.used_codes.flush)
+        watch_event_loop()              # Logs GUI stalls when PYQT_INSTRUMENT=1, otherwise does nothing
 
+    @timed
     def start_scanning(self):
-        self.cap = cv2.VideoCapture(0)  # Start video capture from the webcam
-        self.cap.set(3, 640)            # Set width
-        self.cap.set(4, 480)            # Set height
+        self.used_codes.open()          # Open the database only when it is first needed
+        self.flush_timer.start(1000)    # Save new codes every second
+
+        self.pipeline = ScannerPipeline(self.sources, self.decoder, self.processes)
+        self.pipeline.frame_scanned.connect(self.scan_frame)        # Decoded codes arrive on the GUI thread
+        self.pipeline.capture_failed.connect(self.capture_failed)
+        self.pipeline.start()
+        self.failed_cameras.clear()
+        self.camera_messages = ["scanning"] * len(self.sources)
+        if self.camera_labels:
+            self.stats_timer.start(1000)
 
         self.message_label.setText("Scanning...")   # Update message
         self.start_button.setEnabled(False)  # Disable start button
         self.stop_button.setEnabled(True)    # Enable stop button
-        self.timer.start(100)                # Start timer to capture frames every 100 ms
 
+    @timed
     def stop_scanning(self):
-        self.timer.stop()              # Stop the timer
-        if self.cap:
-            self.cap.release()       # Release the camera
-            cv2.destroyAllWindows()  # Close any OpenCV windows
+        if self.pipeline:
+            self.pipeline.stop()     # Stop the threads and release the camera
+            self.pipeline = None
+        for preview in self.previews:
+            preview.clear()
+        self.stats_timer.stop()
+        self.flush_timer.stop()
+        self.used_codes.flush()      # Save any codes that are still waiting
         self.message_label.setText("Scanning stopped.")  # Update message
         self.start_button.setEnabled(True)   # Enable start button
         self.stop_button.setEnabled(False)   # Disable stop button
 
-    def scan_frame(self):
-        if not self.cap:
-            return
-        
-        success, frame = self.cap.read()  # Read a frame from the webcam
-        if not success:
-            self.message_label.setText("Failed to capture frame.")
-            return
-        
-        for code in decode(frame):  # Decode any QR codes in the frame
-            code_data = code.data.decode('utf-8')
-            if code_data not in self.used_codes:
-                self.used_codes.append(code_data)  # Add the code to the list of used codes
-                self.message_label.setText(f"Approved: {code_data}")  # Update message
-                print(f"Approved: {code_data}")  # Print to console
-                time.sleep(1)  # Short delay to avoid duplicates
+    def capture_failed(self, camera, message):
+        self.failed_cameras.add(camera)
+        self.camera_messages[camera] = message
+        if len(self.failed_cameras) == len(self.sources):   # Keep going while any camera still works
+            self.stop_scanning()
+            self.message_label.setText(message)
+
+    @timed
+    def scan_frame(self, camera, results):
+        # Called with the codes a decode thread found in one frame, never blocks
+        prefix = f"Camera {camera}: " if self.camera_labels else ""
+        self.previews[camera].show_results(results)   # Outline the codes in the preview
+        for result in results:
+            code_data = result.data
+            status = self.codes.check(code_data)   # Constant-time set and dict lookups, shared by all cameras
+            if status == NEW:
+                message = f"Approved: {code_data}"
+            elif status == USED:
+                message = "This code has already been used."
             else:
-                self.message_label.setText(f"This code has already been used.")
-                print("This code has already been used.")  # Print to console
-                time.sleep(1)  # Short delay to avoid duplicates
+                continue    # REPEATED: the same code is still in view, it was already reported
+            self.message_label.setText(prefix + message)  # Update message
+            self.camera_messages[camera] = message
+            print(prefix + message)  # Print to console
 
-        # Show the video feed
-        cv2.imshow('QR and Barcode Scanner', frame)
-        cv2.waitKey(1)  # Wait for 1 ms before capturing the next frame
+    @timed
+    def update_stats(self):
+        if not self.pipeline:
+            return
+        for number, (label, stats) in enumerate(zip(self.camera_labels, self.pipeline.stats())):
+            label.setText(f"Camera {number}: {self.camera_messages[number]} ({stats})")
+
+    def closeEvent(self, event):
+        self.stop_scanning()         # Don't leave camera threads running after the window closes
+        self.used_codes.close()
+        super().closeEvent(event)
 
 
             
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)                    # Initializes application
-    window = ScannerApp()                              # Create instance of our class
+    parser = argparse.ArgumentParser(description="QR and Barcode Scanner")
+    parser.add_argument("--scale", type=float, default=0.5, help="size of the first, shrunken decode pass (default 0.5)")
+    parser.add_argument("--roi", help="only search x,y,width,height of the frame, for example 160,120,320,240")
+    parser.add_argument("--full-frame", action="store_true", help="decode every full color frame (the old, slower mode)")
+    parser.add_argument("--video", help="scan a recorded video file instead of the webcam")
+    parser.add_argument("--images", help="scan every image in a folder instead of the webcam")
+    parser.add_argument("--camera", type=int, action="append",
+                        help="webcam index to scan, repeat for several cameras (default 0)")
+    parser.add_argument("--processes", type=int,
+                        help="decoder processes shared by all cameras (default: one per camera, up to one per CPU core, with several cameras)")
+    args, qt_args = parser.parse_known_args()       # Anything else is passed on to Qt
+
+    if args.full_frame:
+        decoder = decode_frame
+    else:
+        roi = tuple(int(value) for value in args.roi.split(",")) if args.roi else None
+        decoder = RegionDecoder(scale=args.scale, roi=roi)
+
+    if args.video:
+        sources = [VideoFileSource(args.video)]
+    elif args.images:
+        sources = [ImageFolderSource(args.images)]
+    else:
+        sources = [CameraSource(index, 640, 480) for index in (args.camera or [0])]
+
+    processes = args.processes
+    if processes is None:
+        processes = min(len(sources), os.cpu_count() or 1) if len(sources) > 1 else 0   # More would sit idle
+
+    app = QApplication(sys.argv[:1] + qt_args)      # Initializes application
+    window = ScannerApp(decoder, sources, processes)   # Create instance of our class
     window.show()                                   # Show method to run app
     sys.exit(app.exec())                            # sys.exit to exit app
\ No newline at end of file
@@ -0,0 +1,375 @@
+'''
+Headless benchmark for the PyQt apps.
+
+Runs every app without a screen (QT_QPA_PLATFORM=offscreen) and measures:
+    - cold start: a fresh Python process imports the app and shows its window
+    - submit latency: time for one submit_action (plus the repaint after it) as the table grows
+    - CSV export: rows and megabytes per second written by the export worker, and its peak memory,
+      each table size in a fresh process
+    - event loop stalls: the longest time the window could not react while a big table was saved and loaded
+    - peak memory (peak RSS) of every process
+
+Every app also has an import time budget (IMPORT_BUDGETS_MS). With
+--check-budgets the benchmark exits with an error when an app imports
+slower than its budget, so a change that loads something heavy at start
+(OpenCV, csv, logging...) is noticed.
+
+The results are printed and written to a JSON file. Keep the files of
+older versions around to see whether a change made things faster or slower.
+
+Examples:
+    python app_benchmark.py
+    python app_benchmark.py --rows 10000 100000 --engines model --json after.json
+    python app_benchmark.py --rows 1000 --check-budgets
+'''
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")    # Must be set before the QApplication is created
+
+try:
+    import resource                 # Only on Linux and macOS
+except ImportError:
+    resource = None
+
+'''
+argparse - reads the command line options
+contextlib - turns empty_folder() into a with-block
+json - writes the results to a file that other tools can read
+platform - records which machine and Python the numbers came from
+statistics - median of the repeated cold starts
+subprocess - runs every cold start in a fresh Python process, so nothing is imported yet
+tempfile - every run works in an empty folder, so no table_data.csv or journal from a real session is picked up
+time - time.perf_counter() is a precise clock for timing
+array - compact typed arrays, used to build big test tables quickly
+resource - reports the peak memory (RSS) of a process where /proc can't; missing on Windows, then memory is left out
+'''
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS = [                                        # (module, window class) of every app
+    ("PyQt_tutorial", "PyQtApp"),
+    ("PyQt5_Table_Tutorial", "PyQtApp"),
+    ("Intermediate_PyQt5_GUI", "PyQtApp"),
+    ("QR_Barcode_Reader", "ScannerApp"),
+]
+# Milliseconds to import each app in a fresh process (Python already running, .pyc files present).
+# Measured at 60-75 ms each on a desktop, nearly all of it PyQt5.QtWidgets; before OpenCV,
+# pyzbar, csv and logging were loaded lazily it was 104 ms for Intermediate and 242 ms for the scanner.
+IMPORT_BUDGETS_MS = {
+    "PyQt_tutorial": 100,
+    "PyQt5_Table_Tutorial": 100,
+    "Intermediate_PyQt5_GUI": 110,
+    "QR_Barcode_Reader": 110,
+}
+DEFAULT_ROWS = [10000, 100000]
+SUBMITS_PER_SIZE = 50
+MONITOR_MS = 5              # The stall monitor expects a timer tick this often
+STALL_MS = 50               # A tick this late counts as a stall the user can notice
+PHASE_TIMEOUT = 300         # Seconds before a save or load phase is given up on
+FIRST_DOB = 2440000         # Julian day in 1968, test birthdays start here
+
+
+def summary_ms(seconds):
+    from scanner_benchmark import percentile    # Not at the top: the cold start child must not load QtCore early
+    values = sorted(seconds)
+    return {
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p90": round(percentile(values, 90) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "max": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def peak_rss_mb():
+    # Highest memory use of this process so far, None where the platform can't tell
+    try:
+        with open("/proc/self/status", encoding='ascii') as status:
+            for line in status:
+                if line.startswith("VmHWM:"):       # Linux; ru_maxrss there keeps the parent's peak across exec
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)    # Bytes on macOS, KiB on Linux
+
+
+def git_commit():
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+# --- Cold start (each run in its own process) ---
+
+def startup_child(module_name, class_name):
+    # Runs inside the fresh process started by cold_start()
+    started = time.perf_counter()
+    module = __import__(module_name)
+    imported = time.perf_counter()
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    window = getattr(module, class_name)()
+    window.show()
+    app.processEvents()                         # Lay out and paint the first frame
+    shown = time.perf_counter()
+
+    print(json.dumps({
+        "import_ms": round((imported - started) * 1000, 2),
+        "window_ms": round((shown - imported) * 1000, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+    os._exit(0)                                 # Skip shutdown, the journal or camera threads don't matter here
+
+
+def cold_start(module_name, class_name, repeat):
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as folder:
+            env = dict(os.environ, PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+            started = time.perf_counter()
+            output = subprocess.run([sys.executable, os.path.join(HERE, "app_benchmark.py"),
+                                     "--startup-child", module_name, class_name],
+                                    cwd=folder, env=env, capture_output=True, text=True)
+            total = time.perf_counter() - started
+        if output.returncode != 0:
+            error = output.stderr.strip().splitlines()
+            return {"app": module_name, "error": error[-1] if error else f"exit code {output.returncode}"}
+        run = json.loads(output.stdout.strip().splitlines()[-1])
+        run["process_ms"] = round(total * 1000, 2)      # Includes starting Python itself
+        runs.append(run)
+
+    result = {"app": module_name, "runs": len(runs)}
+    for key in ("import_ms", "window_ms", "process_ms"):
+        result[key] = round(statistics.median(run[key] for run in runs), 2)
+    result["peak_rss_mb"] = max((run["peak_rss_mb"] or 0) for run in runs) or None
+    result["import_budget_ms"] = IMPORT_BUDGETS_MS.get(module_name)
+    result["over_budget"] = result["import_budget_ms"] is not None and result["import_ms"] > result["import_budget_ms"]
+    return result
+
+
+# --- Benchmarks inside one process ---
+
+@contextlib.contextmanager
+def empty_folder():
+    # The Intermediate app reads and writes table_data.csv and its journal in the current folder,
+    # so every test gets its own empty one and nothing carries over from the test before
+    start_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            yield folder
+        finally:
+            os.chdir(start_folder)
+
+
+def make_snapshot(count, start=0):
+    from person_table import TableSnapshot, LANGUAGES
+    numbers = range(start, start + count)
+    return TableSnapshot([f"Person {number}" for number in numbers],
+                         [f"person{number}@example.com" for number in numbers],
+                         array("i", (FIRST_DOB + number % 20000 for number in numbers)),
+                         bytes(number % 2 for number in numbers),
+                         bytes(number % len(LANGUAGES) for number in numbers))
+
+
+def table_rows(window):
+    return window.model.rowCount() if window.model is not None else window.table.rowCount()
+
+
+def close_window(window):
+    if window.journal is not None:
+        window.journal.close()
+    window.journal = None                       # closeEvent would close it again
+    window.close()
+
+
+def submit_latency(app, engine, sizes, submits):
+    from Intermediate_PyQt5_GUI import PyQtApp
+    with empty_folder():
+        window = PyQtApp(engine)
+        window.show()
+        results = submit_rounds(app, window, engine, sizes, submits)
+        close_window(window)
+    return results
+
+
+def submit_rounds(app, window, engine, sizes, submits):
+    results = []
+    for size in sorted(sizes):
+        missing = size - table_rows(window)
+        if missing > 0:
+            window.add_batch(make_snapshot(missing, table_rows(window)))     # Grow the table in one bulk insert
+            app.processEvents()
+
+        latencies = []
+        for number in range(submits):
+            window.name_field.setText("New Person")                 # Names may only contain letters
+            window.email_field.setText(f"new{size}.{number}@example.com")   # Unique, duplicates are rejected
+            started = time.perf_counter()
+            window.submit_action()
+            app.processEvents()                 # Include the repaint the user waits for
+            latencies.append(time.perf_counter() - started)
+        results.append({"engine": engine, "rows": size, "submits": submits, "latency_ms": summary_ms(latencies)})
+    return results
+
+
+def export_child(rows):
+    # Runs inside the fresh process started by export_throughput(), so the peak memory is the export's own
+    from table_io import write_csv_atomic
+    snapshot = make_snapshot(rows)
+    table_rss = peak_rss_mb()
+    with empty_folder():
+        started = time.perf_counter()
+        write_csv_atomic("export.csv", snapshot)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize("export.csv")
+    print(json.dumps({
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed),
+        "mb_per_second": round(size / elapsed / 1e6, 1),
+        "file_mb": round(size / 1e6, 1),
+        "table_rss_mb": table_rss,              # Peak before the export started (the table itself)
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+    os._exit(0)
+
+
+def export_throughput(rows):
+    env = dict(os.environ, PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.run([sys.executable, os.path.join(HERE, "app_benchmark.py"), "--export-child", str(rows)],
+                            env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        error = output.stderr.strip().splitlines()
+        return {"rows": rows, "error": error[-1] if error else f"exit code {output.returncode}"}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def watch_event_loop(call, done):
+    # Run the event loop until done() is true and record how late every timer tick was
+    from PyQt5.QtCore import QEventLoop, QTimer
+    from scanner_benchmark import percentile
+    loop = QEventLoop()
+    ticks = []
+    timer = QTimer()
+    timer.setInterval(MONITOR_MS)
+
+    def tick():
+        ticks.append(time.perf_counter())
+        if done() or ticks[-1] - ticks[0] > PHASE_TIMEOUT:
+            loop.quit()
+
+    timer.timeout.connect(tick)
+    timer.start()
+    ticks.append(time.perf_counter())
+    call_started = time.perf_counter()
+    call()                                      # The slot itself blocks the loop too, count it
+    call_seconds = time.perf_counter() - call_started
+    loop.exec_()
+    timer.stop()
+
+    stalls = [(later - earlier) - MONITOR_MS / 1000 for earlier, later in zip(ticks, ticks[1:])]
+    return {
+        "seconds": round(ticks[-1] - ticks[0], 3),
+        "call_ms": round(call_seconds * 1000, 2),
+        "max_stall_ms": round(max(stalls, default=0.0) * 1000, 2),
+        "stalls_over_%dms" % STALL_MS: sum(1 for stall in stalls if stall * 1000 > STALL_MS),
+        "stall_p99_ms": round(percentile(sorted(stalls), 99) * 1000, 2),
+    }
+
+
+def event_loop_stalls(app, rows):
+    from PyQt5.QtCore import QThreadPool
+    from Intermediate_PyQt5_GUI import PyQtApp
+    pool = QThreadPool.globalInstance()
+    results = []
+    with empty_folder() as folder:
+        path = os.path.join(folder, "stall_test.csv")
+        with empty_folder():
+            window = PyQtApp()
+            window.show()
+            window.add_batch(make_snapshot(rows))
+            app.processEvents()
+            result = watch_event_loop(lambda: window.save_table_to_csv(path), lambda: pool.activeThreadCount() == 0)
+            results.append(dict(result, phase="save_table_to_csv", rows=rows))
+            close_window(window)
+
+        # Loading also saves the table afterwards (the imported rows go into table_data.csv), both are counted
+        with empty_folder():
+            window = PyQtApp()
+            window.show()
+            app.processEvents()
+            result = watch_event_loop(lambda: window.load_table_from_csv(path),
+                                      lambda: window.import_task is None and pool.activeThreadCount() == 0)
+            results.append(dict(result, phase="load_table_from_csv", rows=table_rows(window)))
+            close_window(window)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PyQt apps without a display.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS,
+                        help="table sizes for the submit, export and stall tests (default 10000 100000)")
+    parser.add_argument("--engines", nargs="+", choices=["model", "widget"], default=["model", "widget"],
+                        help="Intermediate table engines to measure submit latency for")
+    parser.add_argument("--submits", type=int, default=SUBMITS_PER_SIZE, help="submits timed at each table size")
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts per app, the median is reported")
+    parser.add_argument("--json", default="app_benchmark.json", help="file the results are written to")
+    parser.add_argument("--check-budgets", action="store_true", help="exit with code 1 if an app imports slower than its budget")
+    parser.add_argument("--startup-child", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--export-child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.startup_child:
+        startup_child(*args.startup_child)
+    if args.export_child:
+        export_child(args.export_child)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cold_start": [cold_start(module, name, args.repeat) for module, name in APPS],
+    }
+
+    sys.path.insert(0, HERE)
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QT_VERSION_STR
+    report["qt"] = QT_VERSION_STR
+    app = QApplication(sys.argv[:1])
+    report["submit"] = [result for engine in args.engines
+                        for result in submit_latency(app, engine, args.rows, args.submits)]
+    report["export"] = [export_throughput(rows) for rows in args.rows]
+    report["stalls"] = event_loop_stalls(app, max(args.rows))
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    print(json.dumps(report, indent=2))
+    with open(args.json, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+
+    over = [result["app"] for result in report["cold_start"] if result.get("over_budget")]
+    if over:
+        print("Over the import time budget: " + ", ".join(over), file=sys.stderr)
+        if args.check_budgets:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
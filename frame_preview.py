@@ -0,0 +1,99 @@
+'''
+Live camera preview drawn inside the Qt window.
+
+The OpenCV window (cv2.imshow + cv2.waitKey) ran a second event loop next
+to Qt's. FramePreview is a plain QWidget instead: it copies the newest frame
+into one buffer it allocated up front, and a QImage points straight at that
+buffer, so no new image is built per frame. Boxes around decoded codes are
+drawn on top with QPainter.
+
+The preview has its own timer, so it can show 30 frames per second while
+decoding runs at whatever speed the decoder manages, and it does nothing at
+all while the window is hidden or minimized.
+'''
+import time
+from PyQt5.QtWidgets import QWidget, QSizePolicy
+from PyQt5.QtGui import QImage, QPainter, QPen, QColor, QPolygonF
+from PyQt5.QtCore import QTimer, QPointF, QRectF, Qt
+
+'''
+numpy - frames are NumPy arrays, the preview keeps one preallocated array (imported in allocate(),
+    by then the capture thread has loaded it already, so the app starts without it)
+QWidget - base class, the preview paints itself in paintEvent
+QSizePolicy - lets the preview grow with the window
+QImage - an image that can point at memory we own (the NumPy buffer), no copy needed
+QPainter - draws the image and the code outlines
+QPen / QColor - outline style of the boxes
+QPolygonF / QPointF / QRectF - shapes in floating point widget coordinates
+QTimer - repaints the preview at its own frame rate
+'''
+
+
+PREVIEW_FPS = 30
+OVERLAY_SECONDS = 0.5       # How long a box stays on screen after its code was last decoded
+
+
+class FramePreview(QWidget):
+    def __init__(self, frame_getter, fps=PREVIEW_FPS, parent=None):
+        # frame_getter - called on every tick, returns the newest frame or None if there is nothing new
+        super().__init__(parent)
+        self.frame_getter = frame_getter
+        self.buffer = None          # Preallocated frame buffer, only replaced if the frame size changes
+        self.image = None           # QImage that points at self.buffer
+        self.overlays = []          # Polygons of the last decoded codes
+        self.overlay_time = 0.0
+        self.setMinimumSize(320, 240)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)   # We paint every pixel, Qt doesn't need to clear first
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(int(1000 / fps))
+
+    def tick(self):
+        if not self.isVisible() or self.window().isMinimized():
+            return                                  # Nobody can see it, skip the copy and the paint
+        frame = self.frame_getter()
+        if frame is None:
+            return
+        if self.buffer is None or self.buffer.shape != frame.shape:
+            self.allocate(frame.shape)
+        self.buffer[...] = frame                    # One memcpy into memory the QImage already points at
+        self.update()                               # Qt paints once per event loop pass, even if called often
+
+    def allocate(self, shape):
+        import numpy as np
+        height, width = shape[:2]
+        channels = shape[2] if len(shape) == 3 else 1
+        self.buffer = np.empty(shape, np.uint8)
+        image_format = QImage.Format_BGR888 if channels == 3 else QImage.Format_Grayscale8   # OpenCV frames are BGR
+        # QImage wraps the NumPy memory directly. self.buffer must live as long as self.image, which it does.
+        self.image = QImage(self.buffer.data, width, height, self.buffer.strides[0], image_format)
+
+    def show_results(self, results):
+        self.overlays = [result.polygon for result in results]
+        self.overlay_time = time.monotonic()
+
+    def clear(self):
+        self.buffer = None
+        self.image = None
+        self.overlays = []
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self.image is None:
+            return
+
+        # Fit the frame into the widget, keeping its shape
+        scale = min(self.width() / self.image.width(), self.height() / self.image.height())
+        target = QRectF(0, 0, self.image.width() * scale, self.image.height() * scale)
+        target.moveCenter(QRectF(self.rect()).center())
+        painter.drawImage(target, self.image)
+
+        if self.overlays and time.monotonic() - self.overlay_time < OVERLAY_SECONDS:
+            painter.setPen(QPen(QColor("#00c853"), 3))
+            for polygon in self.overlays:
+                points = [QPointF(target.left() + x * scale, target.top() + y * scale) for x, y in polygon]
+                painter.drawPolygon(QPolygonF(points))
@@ -0,0 +1,124 @@
+'''
+Frame sources for the QR and Barcode Scanner.
+
+Every source works like cv2.VideoCapture: open() it, call read() to get
+(success, frame) and release() it at the end. The scanner pipeline and the
+benchmark can then run from a webcam, a recorded video, a folder of images
+or generated QR codes, without caring which one it is.
+'''
+import os
+import random
+
+'''
+os - used to list the image folder
+random - places the synthetic codes at random positions (seeded, so runs repeat)
+cv2 - OpenCV library for image processing, and numpy - frames are NumPy arrays, used to build the synthetic frames:
+    both are imported inside the methods that use them, which run on the capture thread, so the app starts without them
+'''
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class CameraSource:
+    def __init__(self, index=0, width=640, height=480):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.cap = None
+        self.expected = None                # Unknown for a live camera
+
+    def open(self):
+        import cv2
+        self.cap = cv2.VideoCapture(self.index)  # Start video capture from the webcam
+        self.cap.set(3, self.width)              # Set width
+        self.cap.set(4, self.height)             # Set height
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        if self.cap:
+            self.cap.release()                  # Release the camera
+
+
+class VideoFileSource(CameraSource):
+    # A recorded video, read frame by frame as fast as it can be decoded
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def open(self):
+        import cv2
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video {self.path}")
+
+
+class ImageFolderSource:
+    # Every image in a folder, in name order, one per frame
+    def __init__(self, folder):
+        self.folder = folder
+        self.paths = []
+        self.position = 0
+        self.expected = None
+
+    def open(self):
+        names = sorted(name for name in os.listdir(self.folder) if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.paths = [os.path.join(self.folder, name) for name in names]
+        self.position = 0
+
+    def read(self):
+        import cv2
+        while self.position < len(self.paths):
+            frame = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        pass
+
+
+class SyntheticSource:
+    # Generated frames with QR codes at random places, so no camera or files are needed.
+    # After each read(), `expected` holds the code text in that frame (None for an empty frame).
+    def __init__(self, count=300, width=640, height=480, empty_ratio=0.2, seed=0):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.empty_ratio = empty_ratio      # Share of frames without a code
+        self.seed = seed
+        self.position = 0
+        self.expected = None
+
+    def open(self):
+        import cv2
+        self.random = random.Random(self.seed)
+        self.encoder = cv2.QRCodeEncoder.create()
+        self.position = 0
+
+    def read(self):
+        import cv2
+        import numpy as np
+        if self.position >= self.count:
+            return False, None
+        self.position += 1
+        frame = np.full((self.height, self.width, 3), 255, np.uint8)     # White background
+        if self.random.random() < self.empty_ratio:
+            self.expected = None
+            return True, frame
+
+        self.expected = f"TICKET-{self.position:06d}"
+        code = self.encoder.encode(self.expected)
+        size = self.random.randint(3, 8)                                  # Pixels per QR module
+        code = cv2.resize(code, None, fx=size, fy=size, interpolation=cv2.INTER_NEAREST)
+        code = code[:self.height, :self.width]
+        top = self.random.randint(0, self.height - code.shape[0])
+        left = self.random.randint(0, self.width - code.shape[1])
+        frame[top:top + code.shape[0], left:left + code.shape[1]] = code[:, :, None]
+        return True, frame
+
+    def release(self):
+        pass
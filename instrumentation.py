@@ -0,0 +1,160 @@
+'''
+Optional timing and hang detection for the PyQt apps.
+
+Switched on with an environment variable, for example:
+    PYQT_INSTRUMENT=1 python Intermediate_PyQt5_GUI.py
+
+When it is on:
+    - slots marked with @timed count their calls and time; a call slower than SLOW_SLOT_MS is logged right away
+    - a watchdog thread notices when the GUI thread has not come back to the event loop
+      for PYQT_STALL_MS milliseconds and logs the GUI thread's stack, so the log shows what it was stuck in
+    - a summary of all timed slots is logged every minute and when the app exits
+Everything is written to instrumentation.log (or PYQT_INSTRUMENT_LOG), rotated at 1 MB.
+
+When it is off (the default) this is decided once, at import: @timed hands the
+function back unchanged and watch_event_loop() does nothing, so there is no
+cost at all.
+'''
+import os
+import sys
+import threading
+import time
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+ENABLED = os.environ.get("PYQT_INSTRUMENT", "") not in ("", "0")
+if ENABLED:
+    # Only loaded when switched on, logging and inspect alone would add ~25 ms to every app's start
+    import atexit
+    import functools
+    import inspect
+    import logging
+    import traceback
+    from logging.handlers import RotatingFileHandler
+
+'''
+sys - sys._current_frames() gives the frame every thread is running right now
+threading - the watchdog runs on its own thread, so it still runs while the GUI thread is stuck
+QCoreApplication - the heartbeat timer belongs to the application, not to one window
+QTimer - the heartbeat that only fires when the GUI thread gets back to the event loop
+atexit - logs the slot summary when the app exits
+functools - functools.wraps keeps the slot's name on the timing wrapper
+inspect - CO_VARARGS tells whether a slot takes *args
+logging / RotatingFileHandler - the log file, which starts a new file when it gets too big
+traceback - turns the GUI thread's current frame into a readable stack
+'''
+
+
+LOG_FILE = os.environ.get("PYQT_INSTRUMENT_LOG", "instrumentation.log")
+STALL_MS = float(os.environ.get("PYQT_STALL_MS", "200"))    # GUI thread away this long counts as a stall
+SLOW_SLOT_MS = 50           # Slot calls at least this slow are logged one by one
+HEARTBEAT_MS = 50           # How often the GUI thread tells the watchdog it is alive
+SUMMARY_SECONDS = 60
+LOG_BYTES = 1000000
+LOG_BACKUPS = 3             # Older logs kept as instrumentation.log.1, .2, .3
+
+logger = logging.getLogger("pyqt.instrumentation") if ENABLED else None
+stats = {}                  # Slot name -> [calls, total seconds, slowest seconds]
+stats_lock = threading.Lock()
+watchdog = None
+
+
+def setup_log():
+    if logger.handlers:
+        return
+    handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    atexit.register(log_summary)
+
+
+# --- Slot timing ---
+
+def timed(function):
+    if not ENABLED:
+        return function                         # Nothing is wrapped, the slot runs exactly as before
+    setup_log()
+    name = function.__qualname__
+    code = function.__code__
+    # PyQt drops signal arguments a plain slot doesn't take (clicked sends a `checked` flag),
+    # but it can't see through this wrapper's *args, so the extras are dropped here
+    takes = None if code.co_flags & inspect.CO_VARARGS else code.co_argcount
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if takes is not None:
+            args = args[:takes]
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - started)
+    return wrapper
+
+
+def record(name, seconds):
+    with stats_lock:
+        entry = stats.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+    if seconds * 1000 >= SLOW_SLOT_MS:
+        logger.warning("Slow slot %s took %.1f ms", name, seconds * 1000)
+
+
+def log_summary():
+    with stats_lock:
+        rows = sorted(stats.items(), key=lambda item: item[1][1], reverse=True)    # Most total time first
+    for name, (calls, total, slowest) in rows:
+        logger.info("Slot %s: %d calls, %.2f ms average, %.1f ms slowest, %.0f ms total",
+                    name, calls, total / calls * 1000, slowest * 1000, total * 1000)
+
+
+# --- Stall watchdog ---
+
+class StallWatchdog(threading.Thread):
+    def __init__(self, stall_seconds):
+        super().__init__(name="stall-watchdog", daemon=True)
+        self.stall_seconds = stall_seconds
+        self.gui_thread = threading.get_ident()     # Created on the GUI thread
+        self.last_beat = time.monotonic()
+        self.reported = False                       # The current stall was already logged
+
+    def beat(self):
+        # GUI thread, called by the heartbeat timer whenever the event loop is running
+        now = time.monotonic()
+        if self.reported:
+            logger.warning("GUI thread responsive again after %.0f ms", (now - self.last_beat) * 1000)
+            self.reported = False
+        self.last_beat = now
+
+    def run(self):
+        next_summary = time.monotonic() + SUMMARY_SECONDS
+        while True:
+            time.sleep(self.stall_seconds / 4)
+            now = time.monotonic()
+            if not self.reported and now - self.last_beat > self.stall_seconds:
+                self.reported = True
+                frame = sys._current_frames().get(self.gui_thread)     # What the GUI thread is running right now
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "(no stack)\n"
+                logger.warning("GUI thread stalled for %.0f ms, it is running:\n%s",
+                               (now - self.last_beat) * 1000, stack.rstrip())
+            if now >= next_summary:
+                log_summary()
+                next_summary = now + SUMMARY_SECONDS
+
+
+def watch_event_loop():
+    # Call from the main window's __init__; only the first call starts the watchdog
+    global watchdog
+    if not ENABLED or watchdog is not None:
+        return watchdog
+    setup_log()
+    watchdog = StallWatchdog(STALL_MS / 1000)
+    timer = QTimer(QCoreApplication.instance())
+    timer.timeout.connect(watchdog.beat)
+    timer.start(HEARTBEAT_MS)
+    watchdog.start()
+    logger.info("Instrumentation on, stalls over %.0f ms are logged", STALL_MS)
+    return watchdog
@@ -0,0 +1,71 @@
+'''
+Name storage for the PyQt5 Table Tutorial.
+
+A QTableWidget keeps a QTableWidgetItem object for every cell, which is a
+lot of memory once hundreds of thousands of names are in it. NameStore keeps
+each name once, in a plain list, plus a dict from the name to its row so
+"is this name already in the list?" is answered instantly instead of by
+looking at every row.
+
+NameListModel shows the store in a QTableView. The view only asks for the
+rows that are on screen, so the table stays smooth however long it gets.
+'''
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+'''
+QAbstractListModel - base class for a model with one column of rows
+QModelIndex - points at one row inside a model
+Qt - contains enums like DisplayRole and Horizontal
+'''
+
+
+class NameStore:
+    def __init__(self):
+        self.names = []             # Every name once, in the order it was added
+        self.rows = {}              # Name with case folded ("ann" for "Ann") -> its row in names
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name.casefold() in self.rows     # "Ann" and "ANN" count as the same name
+
+    def add(self, name):
+        # Returns the new row, or None if the name is already stored
+        key = name.casefold()
+        if key in self.rows:
+            return None
+        self.rows[key] = len(self.names)
+        self.names.append(name)
+        return self.rows[key]
+
+
+class NameListModel(QAbstractListModel):
+    def __init__(self, store=None, parent=None):
+        super().__init__(parent)
+        self.store = store if store is not None else NameStore()
+
+    def add_name(self, name):
+        # Add one name at the end, returns False for a duplicate
+        if name in self.store:
+            return False
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row)   # Tell the view exactly which row is new
+        self.store.add(name)
+        self.endInsertRows()
+        return True
+
+    # --- Methods Qt calls to draw the view ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.store.names[index.row()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return "Names" if orientation == Qt.Horizontal else section + 1
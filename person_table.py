@@ -0,0 +1,366 @@
+'''
+Model/view table engine for the Intermediate PyQt5 GUI.
+
+Instead of creating a QTableWidgetItem for every cell, the data lives in one
+compact array per column and a QTableView asks the model only for the cells
+that are actually visible on screen.
+
+The model also keeps a PrefixIndex of the names and emails, updated as rows
+are added, so searching never has to look at every row, and typed sort keys
+(lowercase text, birthday day numbers, flag and language codes) with a
+cached sorted order per column. A dict from each lowercase email to its row
+lets the window reject a duplicate email without looking at every row.
+'''
+from array import array
+from bisect import bisect_left, bisect_right
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QDate, Qt
+from PyQt5.QtWidgets import QStyledItemDelegate, QComboBox
+
+'''
+array - compact typed arrays from the standard library (one C value per entry instead of a Python object)
+bisect - binary search in a sorted list, used by the search index
+QAbstractTableModel - base class for table models used by QTableView
+QModelIndex - points at one cell (row, column) inside a model
+QDate - represents a date, used here to convert between "MM/dd/yyyy" text and day numbers
+Qt - contains enums and flags like ItemIsUserCheckable and the data roles
+QStyledItemDelegate - draws cells and creates editors for them, one delegate serves a whole column
+QComboBox - a dropdown menu widget, created only while a language cell is being edited
+'''
+
+
+HEADERS = ["Names", "Email", "Date of Birth", "Remote", "Language"]    # Column headers shared by both table engines
+NAME_COLUMN, EMAIL_COLUMN, DOB_COLUMN, REMOTE_COLUMN, LANGUAGE_COLUMN = range(5)
+LANGUAGES = ["English", "Spanish", "French", "German", "Chinese", "Japanese"]   # Language options for the dropdown
+LANGUAGE_CODES = {language: code for code, language in enumerate(LANGUAGES)}   # Language name -> code
+DATE_FORMAT = "MM/dd/yyyy"                                              # Format used on screen and in the CSV file
+SHORT_PREFIX = 2                                                        # Searches this short use ready-made answers
+
+
+def dob_to_text(day):
+    if not day:
+        return ""                                            # 0 = no date, written as an empty cell
+    return QDate.fromJulianDay(day).toString(DATE_FORMAT)    # Day number -> "MM/dd/yyyy"
+
+
+def text_to_dob(text):
+    date = QDate.fromString(text, DATE_FORMAT)               # "MM/dd/yyyy" -> QDate (invalid if the text is bad)
+    return date.toJulianDay() if date.isValid() else None
+
+
+def search_terms(name, email):
+    # Lowercase strings a search can start with: the full name, each later word of it, and the email
+    name = name.lower()
+    terms = {name, email.lower()}
+    terms.update(name.split()[1:])      # "john smith" already matches "john", add "smith"
+    return terms
+
+
+def build_segment(names, emails, first_row=0):
+    # (first_row, sorted terms, rows, short prefix table) for a block of rows, numbered from first_row.
+    # Slow part of indexing a batch, so the imports run it on their worker thread, numbering the rows
+    # from where the batch is expected to land so the GUI thread doesn't have to renumber them.
+    keys, rows = [], []
+    for row, (name, email) in enumerate(zip(names, emails), start=first_row):
+        for term in search_terms(name, email):
+            keys.append(term)
+            rows.append(row)
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    keys, rows = [keys[position] for position in order], array("i", (rows[position] for position in order))
+    return first_row, keys, rows, short_prefix_rows(keys, rows)
+
+
+def short_prefix_rows(keys, rows):
+    # For every 1 and 2 character prefix in a segment: the rows with a term starting with it,
+    # each row once and in row order. Terms with the same prefix sit together, so one slice each.
+    table = {}
+    for length in range(1, SHORT_PREFIX + 1):
+        start = 0
+        while start < len(keys):
+            prefix = keys[start][:length]
+            if len(prefix) < length:
+                start = bisect_right(keys, prefix, start)    # A shorter term ("5"), already in a shorter prefix
+                continue
+            stop = bisect_right(keys, prefix + "\U0010ffff", start)
+            table[prefix] = array("i", sorted(set(rows[start:stop])))
+            start = stop
+    return table
+
+
+class PrefixIndex:
+    # Sorted lists of search terms with the row each term belongs to.
+    # All terms starting with some text sit next to each other, so two binary searches find them.
+    # Every bulk batch stays its own sorted segment, so adding one never re-sorts the rows already indexed;
+    # single rows go into a small `tail` segment that is kept sorted as they arrive.
+    # The first letter or two typed match a large part of the table. Building that answer (dropping rows that
+    # match with several terms, then sorting) took longer than a frame, so every segment also keeps the
+    # answer for each short prefix ready, and those searches only join a few arrays.
+    TAIL_LIMIT = 50000
+
+    def __init__(self):
+        self.segments = []          # (sorted terms, row of each term, short_prefix_rows table) per batch
+        self.tail_keys = []         # Sorted lowercase terms of single added rows
+        self.tail_rows = array("i") # tail_rows[i] is the row that tail_keys[i] came from
+
+    def add(self, row, name, email):
+        for term in search_terms(name, email):
+            position = bisect_right(self.tail_keys, term)
+            self.tail_keys.insert(position, term)   # Moves memory in C, fast for a list of this size
+            self.tail_rows.insert(position, row)
+        if len(self.tail_keys) >= self.TAIL_LIMIT:
+            # Freeze the tail, start a new one
+            self.segments.append((self.tail_keys, self.tail_rows, short_prefix_rows(self.tail_keys, self.tail_rows)))
+            self.tail_keys, self.tail_rows = [], array("i")
+
+    def add_many(self, first_row, names, emails, segment=None):
+        built_for, keys, rows, table = segment if segment is not None else build_segment(names, emails, first_row)
+        shift = first_row - built_for
+        if shift:
+            # Other rows were added while the worker indexed the batch: renumber it
+            rows = array("i", (row + shift for row in rows))
+            table = {prefix: array("i", (row + shift for row in found)) for prefix, found in table.items()}
+        self.segments.append((keys, rows, table))
+
+    def search(self, prefix):
+        # Sorted array of the rows that have a term starting with prefix
+        prefix = prefix.lower()
+        if not 0 < len(prefix) <= SHORT_PREFIX:
+            found = set()
+            for keys, rows, _ in self.segments:
+                found.update(self.term_rows(keys, rows, prefix))
+            found.update(self.term_rows(self.tail_keys, self.tail_rows, prefix))
+            return array("i", sorted(found))
+
+        # Short prefix: join the ready-made arrays. Segments don't share rows, so nothing is found twice.
+        found = array("i")
+        in_order = True
+        for _, _, table in self.segments:
+            rows = table.get(prefix)
+            if rows:
+                in_order = in_order and (not found or found[-1] < rows[0])
+                found.extend(rows)
+        tail = sorted(set(self.term_rows(self.tail_keys, self.tail_rows, prefix)))
+        if tail:
+            in_order = in_order and (not found or found[-1] < tail[0])
+            found.extend(tail)
+        # Batches come in row order; single rows added between batches are the only reason to sort
+        return found if in_order else array("i", sorted(found))
+
+    @staticmethod
+    def term_rows(keys, rows, prefix):
+        # Rows of the terms that start with prefix, a row more than once if several of its terms do
+        start = bisect_left(keys, prefix)
+        stop = bisect_right(keys, prefix + "\U0010ffff", start)   # Highest possible character after the prefix
+        return rows[start:stop]
+
+    def matches(self, prefix, name, email):
+        # Same test as search() for a single row
+        prefix = prefix.lower()
+        return any(term.startswith(prefix) for term in search_terms(name, email))
+
+
+class PersonTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # One array per column. Text columns stay Python lists, everything else is packed.
+        self.names = []                 # Name of each person
+        self.emails = []                # Email of each person
+        self.dobs = array("i")          # Date of birth stored as a Julian day number (int32)
+        self.remote = bytearray()       # Remote flag, 0 or 1 per row
+        self.languages = bytearray()    # Index into LANGUAGES per row
+        self.search_index = PrefixIndex()   # Names and emails, kept up to date as rows are added
+        # Sort keys made when a row is added. Birthdays, remote flags and language codes are already numbers.
+        self.name_keys = []             # Lowercase name per row
+        self.email_keys = []            # Lowercase email per row
+        self.email_rows = {}            # Lowercase email -> last row with that email, so duplicate checks are one lookup
+        self.sort_cache = {}            # column -> rows in ascending order, dropped when the column changes
+        self.journal = None             # Optional TableJournal that records every change (see table_journal.py)
+
+    # --- Methods Qt calls to draw the view ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)    # Table models have no children
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+
+        if col == REMOTE_COLUMN:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.remote[row] else Qt.Unchecked
+            return None                                         # Checkbox only, no text
+
+        if role == Qt.DisplayRole or role == Qt.EditRole:
+            if col == NAME_COLUMN:
+                return self.names[row]
+            if col == EMAIL_COLUMN:
+                return self.emails[row]
+            if col == DOB_COLUMN:
+                return dob_to_text(self.dobs[row])             # Only formatted when the cell is visible
+            if col == LANGUAGE_COLUMN:
+                code = self.languages[row]
+                return code if role == Qt.EditRole else LANGUAGES[code]   # Editors work with the code, the view shows the text
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() == REMOTE_COLUMN:
+            return Qt.ItemIsUserCheckable | Qt.ItemIsEnabled     # Same flags as the widget checkbox
+        if index.column() == LANGUAGE_COLUMN:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        row, col = index.row(), index.column()
+
+        if col == REMOTE_COLUMN and role == Qt.CheckStateRole:
+            remote = 1 if value == Qt.Checked else 0
+            self.set_remote(row, remote)
+            if self.journal is not None:
+                self.journal.record_remote(row, remote)
+            return True
+        if col == LANGUAGE_COLUMN and role == Qt.EditRole:
+            if not isinstance(value, int) or not 0 <= value < len(LANGUAGES):
+                return False                                    # Ignore anything that is not a known language code
+            self.set_language(row, value)
+            if self.journal is not None:
+                self.journal.record_language(row, value)
+            return True
+        return False
+
+    # --- Methods the app uses to change the data ---
+
+    def set_remote(self, row, remote):
+        self.remote[row] = remote
+        self.sort_cache.pop(REMOTE_COLUMN, None)               # The sorted order of this column is out of date
+        index = self.index(row, REMOTE_COLUMN)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+    def set_language(self, row, language):
+        self.languages[row] = language
+        self.sort_cache.pop(LANGUAGE_COLUMN, None)
+        index = self.index(row, LANGUAGE_COLUMN)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+
+    def append_row(self, name, email, dob, remote=False, language=0):
+        row = len(self.names)
+        self.beginInsertRows(QModelIndex(), row, row)    # Tell the view a row is coming
+        self.names.append(name)
+        self.emails.append(email)
+        self.dobs.append(dob)
+        self.remote.append(1 if remote else 0)
+        self.languages.append(language)
+        self.name_keys.append(name.casefold())
+        email_key = email.casefold()
+        self.email_keys.append(email_key)
+        self.email_rows[email_key] = row
+        self.search_index.add(row, name, email)
+        for column, rows in self.sort_cache.items():
+            keys = self.sort_keys(column)               # Binary search for the new row's place in each cached order
+            rows.insert(bisect_right(rows, keys[row], key=keys.__getitem__), row)
+        self.endInsertRows()                             # View only repaints if the row is visible
+        return row
+
+    def append_columns(self, batch):
+        # Add many rows at once (for example a TableSnapshot parsed from a CSV file).
+        # The view is told once about the whole block instead of once per row.
+        if len(batch) == 0:
+            return
+        first = len(self.names)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        self.names.extend(batch.names)
+        self.emails.extend(batch.emails)
+        self.dobs.extend(batch.dobs)
+        self.remote.extend(batch.remote)
+        self.languages.extend(batch.languages)
+        self.name_keys.extend(name.casefold() for name in batch.names)
+        email_keys = [email.casefold() for email in batch.emails]
+        self.email_keys.extend(email_keys)
+        self.email_rows.update(zip(email_keys, range(first, first + len(batch))))   # Same string objects, no copies
+        self.search_index.add_many(first, batch.names, batch.emails, batch.search_segment)
+        self.sort_cache.clear()                          # Cheaper to sort again than to merge a big batch
+        self.endInsertRows()
+
+    def find_email(self, email):
+        # A row that already has this email (any upper/lower case), or None
+        return self.email_rows.get(email.strip().casefold())
+
+    # --- Sorting ---
+
+    def sort_keys(self, column):
+        # Values to sort a column by, indexed by row
+        return (self.name_keys, self.email_keys, self.dobs, self.remote, self.languages)[column]
+
+    def sorted_rows(self, column):
+        # Rows in ascending order of a column (ties keep their row order), cached until the column changes
+        rows = self.sort_cache.get(column)
+        if rows is None:
+            keys = self.sort_keys(column)
+            rows = array("i", sorted(range(len(keys)), key=keys.__getitem__))
+            self.sort_cache[column] = rows
+        return rows
+
+    def snapshot(self):
+        # Copy the column arrays so a worker thread can read them while the user keeps editing
+        return TableSnapshot(list(self.names), list(self.emails), array("i", self.dobs),
+                             bytes(self.remote), bytes(self.languages))
+
+
+class TableSnapshot:
+    # A frozen copy of the table columns. Safe to read from a worker thread because nothing else changes it.
+    def __init__(self, names, emails, dobs, remote, languages):
+        self.names = names
+        self.emails = emails
+        self.dobs = dobs
+        self.remote = remote
+        self.languages = languages
+        self.search_segment = None      # Optional build_segment() result, prepared off the GUI thread
+
+    def __len__(self):
+        return len(self.names)
+
+    def rows(self, start, stop):
+        # Rows start..stop-1 as the text values written to the CSV file
+        names, emails, dobs, remote, languages = self.names, self.emails, self.dobs, self.remote, self.languages
+        return [
+            (names[row], emails[row], dob_to_text(dobs[row]), "Yes" if remote[row] else "No", LANGUAGES[languages[row]])
+            for row in range(start, stop)
+        ]
+
+
+class LanguageDelegate(QStyledItemDelegate):
+    # The Language column stores a small integer code (index into LANGUAGES).
+    # This one delegate shows the language name and only creates a QComboBox while a cell is being edited.
+
+    def displayText(self, value, locale):
+        if isinstance(value, int) and 0 <= value < len(LANGUAGES):
+            return LANGUAGES[value]                      # Code -> language name for display
+        return super().displayText(value, locale)
+
+    def createEditor(self, parent, option, index):
+        combo = QComboBox(parent)                        # Editor lives only until editing finishes
+        combo.addItems(LANGUAGES)
+        combo.activated.connect(lambda: self.commit_and_close(combo))   # Picking an item finishes the edit
+        return combo
+
+    def setEditorData(self, editor, index):
+        code = index.data(Qt.EditRole)
+        editor.setCurrentIndex(code if isinstance(code, int) else 0)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentIndex(), Qt.EditRole)    # Store the code, not the text
+
+    def commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
@@ -0,0 +1,74 @@
+'''
+Input rules for the Intermediate PyQt5 GUI.
+
+Every rule is a regular expression that the whole value has to match, plus
+the message shown when it doesn't. The expressions are compiled once, when
+this module is imported, so checking a field on every pause in typing costs
+a few microseconds and never builds a pattern again.
+
+Python's regular expressions don't count combining marks (the vowel signs
+of Hindi or Thai, an accent typed as a separate character) as letters.
+check_name first joins what it can with NFC normalization, then stands in
+MARK for every remaining mark, which the name rule accepts after a letter.
+
+Checking an email against the people already in the table is not done here:
+PersonTableModel keeps a dict of the emails (see find_email), so that check
+is one lookup however many rows there are.
+'''
+import re
+import unicodedata
+
+'''
+re - regular expressions; re.compile turns a pattern into a reusable matcher
+unicodedata - Unicode normalization and character categories (to find combining marks)
+'''
+
+
+MAX_NAME_LENGTH = 100
+MAX_EMAIL_LENGTH = 254          # Longest address mail servers accept
+MARK = "\ue000"                 # Private-use character that stands in for a combining mark while checking
+LETTER = r"[^\W\d_]\ue000*"    # A letter with any combining marks after it
+
+NAME_RULES = [
+    (re.compile(r".{0,%d}" % MAX_NAME_LENGTH, re.DOTALL), f"Names can be at most {MAX_NAME_LENGTH} characters long."),
+    # Words of letters joined by spaces, hyphens, apostrophes or dots:
+    # "Mary-Jane O'Neil Jr.", "José" (also typed as e + U+0301), "प्रिया शर्मा", "ณัฐ"
+    (re.compile(rf"(?:{LETTER})+(?:[ '.-]+(?:{LETTER})+)*\.?"),
+     "Names can only use letters, spaces, hyphens, apostrophes and dots."),
+]
+
+EMAIL_RULES = [
+    (re.compile(r".{0,%d}" % MAX_EMAIL_LENGTH, re.DOTALL), f"Emails can be at most {MAX_EMAIL_LENGTH} characters long."),
+    (re.compile(r"[^@\s]+@[^@\s]+"), "An email needs exactly one @ and no spaces."),
+    # Dot-separated local part, then a domain with at least one dot and a top-level name of 2+ letters
+    (re.compile(r"[\w!#$%&'*+/=?^`{|}~-]+(?:\.[\w!#$%&'*+/=?^`{|}~-]+)*"
+                r"@(?:[^\W_](?:[\w-]*[^\W_])?\.)+[^\W\d_]{2,}"),
+     "That doesn't look like an email address (name@example.com)."),
+]
+
+
+class MarkTable(dict):
+    # str.translate table: combining mark -> MARK, anything else stays. Filled in as characters are seen.
+    def __missing__(self, code):
+        self[code] = MARK if unicodedata.category(chr(code)).startswith("M") else code
+        return self[code]
+
+
+MARKS = MarkTable({ord(MARK): "\ufffd"})      # A MARK typed by the user is not a letter
+
+
+def check(value, rules):
+    # Message of the first rule the value breaks, or None if it passes them all
+    for pattern, message in rules:
+        if pattern.fullmatch(value) is None:
+            return message
+    return None
+
+
+def check_name(name):
+    name = unicodedata.normalize("NFC", name)       # e + U+0301 becomes é
+    return check(name.translate(MARKS), NAME_RULES)
+
+
+def check_email(email):
+    return check(email, EMAIL_RULES)
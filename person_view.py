@@ -0,0 +1,210 @@
+'''
+Filtered and sorted view over PersonTableModel.
+
+QSortFilterProxyModel asks filterAcceptsRow() about every single row each
+time the filter changes, which means calling Python code 500,000 times for a
+big table. PersonProxyModel works like it from the view's side, but gets
+the matching rows straight from the model's PrefixIndex and keeps them in
+one compact array of row numbers.
+
+Sorting works the same way: the model hands over a cached array of rows in
+sorted order (a permutation), and nothing in the model itself is moved.
+'''
+from array import array
+from collections import deque
+from itertools import compress, repeat
+from PyQt5.QtCore import QAbstractProxyModel, QModelIndex, Qt
+
+'''
+array - compact typed arrays, holds the source row of every visible row
+deque / compress / repeat - run loops over many rows in C (deque with maxlen=0 just uses up an iterator)
+QAbstractProxyModel - base class for models that show another model's data in a different shape
+QModelIndex - points at one cell (row, column) inside a model
+'''
+
+
+class PersonProxyModel(QAbstractProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filter_text = ""
+        self.sort_column = -1       # -1 means rows stay in the order they were added
+        self.sort_order = Qt.AscendingOrder
+        self.visible_rows = None    # Source row for each visible row, None means every row in order
+        self.source_to_proxy = None # Reverse lookup of visible_rows, built only when needed
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.rowsAboutToBeInserted.connect(self.source_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self.source_rows_inserted)
+        model.dataChanged.connect(self.source_data_changed)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self.source_model_reset)
+
+    # --- Filtering ---
+
+    def set_filter_text(self, text):
+        text = text.strip()
+        if text == self.filter_text:
+            return
+        self.beginResetModel()
+        self.filter_text = text
+        self.refresh_rows()
+        self.endResetModel()
+
+    # --- Sorting (called by the view when a header is clicked) ---
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.beginResetModel()
+        self.sort_column = column
+        self.sort_order = order
+        self.refresh_rows()
+        self.endResetModel()
+
+    def refresh_rows(self):
+        source = self.sourceModel()
+        matches = source.search_index.search(self.filter_text) if self.filter_text else None
+
+        if self.sort_column < 0:
+            self.visible_rows = matches                 # Already a new array in row order
+        else:
+            ordered = source.sorted_rows(self.sort_column)
+            if matches is None:
+                rows = array("i", ordered)
+            elif len(matches) < len(ordered) // 8:
+                keys = source.sort_keys(self.sort_column)     # Few matches: sort just those
+                rows = array("i", sorted(matches, key=keys.__getitem__))
+            else:
+                # Many matches: keep the cached order, drop the rest. One byte per row marks the matches,
+                # and compress() walks the order in C instead of a Python loop testing set membership.
+                marked = bytearray(len(ordered))
+                deque(map(marked.__setitem__, matches, repeat(1)), maxlen=0)
+                rows = array("i", compress(ordered, map(marked.__getitem__, ordered)))
+            if self.sort_order == Qt.DescendingOrder:
+                rows.reverse()
+            self.visible_rows = rows
+        self.source_to_proxy = None
+
+    def insert_position(self, source_row):
+        # Binary search for where a new row belongs in the sorted visible rows (after equal keys)
+        keys = self.sourceModel().sort_keys(self.sort_column)
+        key = keys[source_row]
+        descending = self.sort_order == Qt.DescendingOrder
+        low, high = 0, len(self.visible_rows)
+        while low < high:
+            middle = (low + high) // 2
+            other = keys[self.visible_rows[middle]]
+            if (key > other) if descending else (key < other):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    # --- Keeping up with the source model ---
+
+    def source_rows_about_to_be_inserted(self, parent, first, last):
+        if self.visible_rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)     # Unfiltered: rows appear exactly as in the source
+
+    def source_rows_inserted(self, parent, first, last):
+        if self.visible_rows is None:
+            self.endInsertRows()
+            return
+
+        # Filtered or sorted: only show the new rows that match the search, in the right place
+        source = self.sourceModel()
+        index = source.search_index
+        new_rows = [row for row in range(first, last + 1)
+                    if not self.filter_text or index.matches(self.filter_text, source.names[row], source.emails[row])]
+        if not new_rows:
+            return
+        if self.sort_column >= 0 and len(new_rows) > 1:
+            self.beginResetModel()                  # A big batch: sort again from the cached order
+            self.refresh_rows()
+            self.endResetModel()
+            return
+
+        if self.sort_column >= 0:
+            position = self.insert_position(new_rows[0])
+        else:
+            position = len(self.visible_rows)
+        self.beginInsertRows(QModelIndex(), position, position + len(new_rows) - 1)
+        self.visible_rows[position:position] = array("i", new_rows)
+        self.source_to_proxy = None
+        self.endInsertRows()
+
+    def source_data_changed(self, top_left, bottom_right, roles=()):
+        resort = top_left.column() <= self.sort_column <= bottom_right.column()
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            proxy_row = self.move_to_sorted_place(row) if resort else self.proxy_row(row)
+            if proxy_row is not None:
+                self.dataChanged.emit(self.index(proxy_row, top_left.column()),
+                                      self.index(proxy_row, bottom_right.column()), roles)
+
+    def move_to_sorted_place(self, row):
+        # The sort key of this source row changed: take it out and binary-insert it again, like dynamicSortFilter.
+        # Returns its new proxy row, or None if the search hides it.
+        try:
+            proxy_row = self.visible_rows.index(row)    # One scan in C, cheaper than rebuilding source_to_proxy after each move
+        except ValueError:
+            return None
+        del self.visible_rows[proxy_row]
+        position = self.insert_position(row)
+        self.visible_rows.insert(proxy_row, row)
+        destination = position + 1 if position >= proxy_row else position   # Counted before the row is taken out
+        if destination in (proxy_row, proxy_row + 1):
+            return proxy_row                            # Already in the right place
+        self.beginMoveRows(QModelIndex(), proxy_row, proxy_row, QModelIndex(), destination)
+        del self.visible_rows[proxy_row]
+        self.visible_rows.insert(position, row)
+        self.source_to_proxy = None
+        self.endMoveRows()
+        return position
+
+    def source_model_reset(self):
+        self.refresh_rows()
+        self.endResetModel()
+
+    # --- Mapping between proxy rows and source rows ---
+
+    def proxy_row(self, source_row):
+        if self.visible_rows is None:
+            return source_row
+        if self.source_to_proxy is None:
+            self.source_to_proxy = {row: position for position, row in enumerate(self.visible_rows)}
+        return self.source_to_proxy.get(source_row)
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row()
+        source_row = row if self.visible_rows is None else self.visible_rows[row]
+        return self.sourceModel().index(source_row, proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = self.proxy_row(source_index.row())
+        return QModelIndex() if row is None else self.index(row, source_index.column())
+
+    # --- Methods Qt calls to draw the view ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.sourceModel().rowCount() if self.visible_rows is None else len(self.visible_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < self.rowCount() and 0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QModelIndex()             # A table has no parent items
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Vertical and role == Qt.DisplayRole:
+            return section + 1          # Number the visible rows 1, 2, 3...
+        return self.sourceModel().headerData(section, orientation, role)
@@ -0,0 +1,115 @@
+'''
+Headless benchmark for the QR and Barcode Scanner decoders.
+
+Runs a decoder over frames from a video file, an image folder or generated
+QR codes and reports frames per second, decode latency percentiles and how
+many frames had a code found. No camera, no window and no Qt event loop are
+needed, so it also runs on a CI machine.
+
+Examples:
+    python scanner_benchmark.py --synthetic 500
+    python scanner_benchmark.py --video gate_recording.mp4 --decoder full
+    python scanner_benchmark.py --images frames/ --scale 0.4 --json results.json
+'''
+import argparse
+import json
+import sys
+import time
+from frame_sources import VideoFileSource, ImageFolderSource, SyntheticSource
+from scanner_pipeline import RegionDecoder, decode_frame
+
+'''
+argparse - reads the command line options
+json - writes the results to a file that other tools can read
+time - time.perf_counter() is a precise clock for timing each decode
+'''
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_benchmark(source, decoder, warmup=5):
+    latencies = []                  # Seconds spent decoding each frame
+    frames = hits = 0               # Frames decoded, frames where a code was found
+    expected_frames = correct = 0   # Only known for synthetic frames
+
+    source.open()
+    try:
+        started = time.perf_counter()
+        while True:
+            success, frame = source.read()
+            if not success:
+                break
+
+            start = time.perf_counter()
+            results = decoder(frame)
+            elapsed = time.perf_counter() - start
+
+            if frames >= warmup:        # The first frames include one-time setup costs
+                latencies.append(elapsed)
+            frames += 1
+            hits += 1 if results else 0
+            if source.expected is not None:
+                expected_frames += 1
+                correct += 1 if any(result.data == source.expected for result in results) else 0
+        total = time.perf_counter() - started
+    finally:
+        source.release()
+
+    latencies.sort()
+    report = {
+        "frames": frames,
+        "seconds": round(total, 3),
+        "frames_per_second": round(frames / total, 1) if total else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p90": round(percentile(latencies, 90) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        "hit_rate": round(hits / frames, 3) if frames else 0.0,
+    }
+    if expected_frames:
+        report["detection_rate"] = round(correct / expected_frames, 3)   # Frames with a code that were read correctly
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the QR and barcode decoders without a camera or display.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--video", help="recorded video file")
+    group.add_argument("--images", help="folder of images")
+    group.add_argument("--synthetic", type=int, default=300, help="number of generated QR frames (default)")
+    parser.add_argument("--decoder", choices=["region", "full"], default="region",
+                        help="region = RegionDecoder (default), full = decode every full color frame")
+    parser.add_argument("--scale", type=float, default=0.5, help="shrunken pass size for the region decoder")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for synthetic frames")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    if args.video:
+        source, name = VideoFileSource(args.video), args.video
+    elif args.images:
+        source, name = ImageFolderSource(args.images), args.images
+    else:
+        source, name = SyntheticSource(args.synthetic, seed=args.seed), f"synthetic:{args.synthetic}"
+    decoder = RegionDecoder(scale=args.scale) if args.decoder == "region" else decode_frame
+
+    report = run_benchmark(source, decoder)
+    report["source"] = name
+    report["decoder"] = args.decoder
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, mode='w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+'''
+Keeps track of which scanned codes were already used.
+
+A code held in front of the camera shows up in every frame, so the scanner
+needs two checks:
+    - has this code been redeemed before? (a set, constant-time lookups)
+    - did we just see it a moment ago? (a short time window, so we report it once)
+
+UsedCodeStore keeps the redeemed codes in a local SQLite database, so a
+ticket stays used after the app restarts.
+'''
+import sqlite3
+import time
+from collections import OrderedDict
+
+'''
+sqlite3 - small database stored in a single file, part of the standard library
+time - time.monotonic() is a clock that never jumps backwards, time.time() is the wall clock
+OrderedDict - remembers insertion order, so the oldest entries can be evicted first
+'''
+
+
+NEW = "new"             # First time this code is seen: approve it
+USED = "used"           # Code was redeemed earlier: reject it
+REPEATED = "repeated"   # Same code is still in front of the camera: don't report it again
+
+RECENT_WINDOW = 2.0     # Seconds a code must be out of view before it is reported again
+STORE_FILE = "used_codes.db"
+STORE_BATCH_SIZE = 100  # Pending codes written to the database in one transaction
+
+
+class CodeDeduplicator:
+    def __init__(self, window=RECENT_WINDOW, used_codes=None, clock=time.monotonic):
+        self.window = window
+        self.used_codes = used_codes if used_codes is not None else set()   # Anything with `in` and add()
+        self.recent = OrderedDict()     # code -> last time seen, oldest first
+        self.clock = clock
+
+    def check(self, code, now=None):
+        now = self.clock() if now is None else now
+        self.evict(now)
+
+        if code in self.recent:
+            self.recent[code] = now
+            self.recent.move_to_end(code)   # Keep the dict ordered by last time seen
+            return REPEATED
+        self.recent[code] = now
+
+        if code in self.used_codes:
+            return USED
+        self.used_codes.add(code)
+        return NEW
+
+    def evict(self, now):
+        # Forget codes that have not been seen for longer than the window
+        cutoff = now - self.window
+        while self.recent:
+            code, seen = next(iter(self.recent.items()))
+            if seen >= cutoff:
+                break
+            self.recent.popitem(last=False)
+
+
+class UsedCodeStore:
+    # Set-like store of redeemed codes backed by SQLite. Works with CodeDeduplicator(used_codes=...).
+    # New codes are kept in memory and written in batches; call flush() regularly (the app uses a timer).
+    def __init__(self, path=STORE_FILE, batch_size=STORE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = None          # Opened on first use, so startup never touches the file
+        self.pending = {}               # code -> redeemed time, not written yet
+
+    def open(self):
+        if self.connection is not None:
+            return
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")      # Readers and the writer don't block each other
+        self.connection.execute("PRAGMA synchronous=NORMAL")    # Safe with WAL and much faster commits
+        # The code is the primary key, so each lookup is one index search, never a full table scan
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS used_codes (code TEXT PRIMARY KEY, redeemed_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def __contains__(self, code):
+        if code in self.pending:
+            return True
+        self.open()
+        row = self.connection.execute("SELECT 1 FROM used_codes WHERE code = ?", (code,)).fetchone()
+        return row is not None
+
+    def add(self, code):
+        self.pending[code] = time.time()
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.open()
+        with self.connection:                   # One transaction for the whole batch
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO used_codes (code, redeemed_at) VALUES (?, ?)", self.pending.items()
+            )
+        self.pending.clear()
+
+    def __len__(self):
+        self.flush()
+        self.open()                             # flush() doesn't open the file when nothing is pending
+        return self.connection.execute("SELECT COUNT(*) FROM used_codes").fetchone()[0]
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,292 @@
+'''
+Frame pipeline for the QR and Barcode Scanner.
+
+The scanner used to read, decode and show every frame inside a QTimer slot
+on the GUI thread. Now capturing and decoding run on worker threads:
+
+    capture thread -> decode queue  -> decode thread  -> Qt signal -> ScannerApp
+                   -> display queue -> FramePreview timer (see frame_preview.py)
+
+The queues only hold the newest frames. If a stage falls behind, old frames
+are dropped instead of piling up, so what you see and what gets decoded is
+always the latest picture from the camera.
+
+With several cameras every camera gets its own capture and decode thread,
+and the decode threads can share a pool of worker processes. pyzbar then
+runs on all CPU cores at once instead of taking turns on Python's GIL.
+Each camera has one frame in the pool at a time (its decoder's state from
+one frame is needed for the next), so more processes than cameras would
+only sit idle.
+
+RegionDecoder is a cheaper decode mode for slow machines: it converts the
+frame to grayscale once, looks for codes in a shrunken copy first, and only
+decodes at full resolution inside the region where a code was found.
+'''
+import copy
+import threading
+import time
+from collections import deque, namedtuple
+from PyQt5.QtCore import QObject, pyqtSignal
+from frame_sources import CameraSource
+
+'''
+copy - gives every camera its own copy of a decoder that remembers state (RegionDecoder)
+threading - worker threads, plus Event/Condition to stop and wake them
+time - time.monotonic() is used for the per-camera frame rates
+multiprocessing / ProcessPoolExecutor - a pool of decoder processes shared by all cameras (imported in start(), only if a pool is used)
+deque - a list with a maximum length that throws away the oldest item when full
+namedtuple - small read-only record type used for scan results
+QObject - base class needed to define signals
+pyqtSignal - emitting a signal from a worker thread delivers it safely on the GUI thread
+CameraSource - the default frame source, a webcam (see frame_sources.py for the others)
+cv2 - OpenCV library for image processing, and pyzbar's decode - decodes barcodes and QR codes:
+    both are imported by load_libraries() when the first frame arrives, not when the app starts
+'''
+
+
+ScanResult = namedtuple("ScanResult", ["data", "kind", "polygon"])   # Decoded text, code type, corner points
+cv2 = None          # Set by load_libraries()
+decode = None
+
+
+def load_libraries():
+    # OpenCV and pyzbar take most of the scanner's start time. The worker threads (or processes)
+    # import them the first time they need them, so the window shows up without waiting.
+    global cv2, decode
+    if decode is None:
+        import cv2 as opencv
+        from pyzbar.pyzbar import decode as zbar_decode
+        cv2 = opencv
+        decode = zbar_decode            # Set last, other threads check this one
+
+
+class LatestQueue:
+    # A thread-safe queue that keeps only the newest `maxlen` items and drops stale ones
+    def __init__(self, maxlen=1):
+        self.items = deque(maxlen=maxlen)
+        self.condition = threading.Condition()
+        self.dropped = 0                        # How many stale items were thrown away
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1               # deque drops the oldest item for us
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        # Returns the oldest kept item, or None if nothing arrived before the timeout
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout)
+            return self.items.popleft() if self.items else None
+
+
+def to_results(codes, scale=1.0, offset=(0, 0)):
+    # Turn pyzbar results into ScanResults, mapping points from a cropped/resized image back to the frame
+    left, top = offset
+    results = []
+    for code in codes:
+        polygon = [(int(point.x / scale) + left, int(point.y / scale) + top) for point in code.polygon]
+        results.append(ScanResult(code.data.decode('utf-8'), code.type, polygon))
+    return results
+
+
+def decode_frame(frame):
+    # Decode all QR codes and barcodes in one frame
+    load_libraries()
+    return to_results(decode(frame))
+
+
+def decode_in_process(decoder, frame):
+    # Runs in a pool process on a copy of the camera's decoder. The copy is sent back with the results,
+    # so what RegionDecoder learned about this frame (where the code was) is used for the next one.
+    return decoder(frame), decoder
+
+
+def to_gray(frame):
+    # pyzbar only needs one channel; a gray frame is also a third of the data to send to a worker process
+    load_libraries()
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+class RegionDecoder:
+    # Decode mode for low-power machines. Call it like decode_frame(frame).
+    #   scale - size of the first, cheap pass (0.5 = half width and height, a quarter of the pixels)
+    #   roi - optional (x, y, width, height) part of the frame to look at, None means the whole frame
+    #   margin - pixels added around a found code before decoding it at full resolution
+    #   full_scan_interval - after this many frames without a code, try one full-resolution pass
+    #                        so codes too small for the shrunken pass are still found (0 turns it off)
+    def __init__(self, scale=0.5, roi=None, margin=40, full_scan_interval=15):
+        self.scale = scale
+        self.roi = roi
+        self.margin = margin
+        self.full_scan_interval = full_scan_interval
+        self.last_region = None         # Where a code was seen in the previous frame
+        self.misses = 0                 # Frames in a row without a code
+
+    def __call__(self, frame):
+        gray = to_gray(frame)           # Convert once, every pass below works on the gray image
+        height, width = gray.shape
+
+        # 1. Full resolution, but only where the code was last seen
+        if self.last_region is not None:
+            results = self.decode_region(gray, self.last_region)
+            if results:
+                return self.found(results, width, height)
+
+        # 2. Cheap pass over a shrunken copy of the search area
+        left, top, right, bottom = self.clip(self.roi or (0, 0, width, height), width, height)
+        if right <= left or bottom <= top:
+            return []                   # ROI lies outside the frame
+        area = gray[top:bottom, left:right]
+        small = cv2.resize(area, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        results = to_results(decode(small), self.scale, (left, top))
+
+        # 3. Every so often, one full-resolution pass for codes that are too small to see when shrunk
+        if not results and self.full_scan_interval and self.misses + 1 >= self.full_scan_interval:
+            self.misses = 0
+            results = to_results(decode(area), 1.0, (left, top))
+
+        if results:
+            return self.found(results, width, height)
+        self.last_region = None
+        self.misses += 1
+        return []
+
+    def decode_region(self, gray, region):
+        left, top, right, bottom = region
+        return to_results(decode(gray[top:bottom, left:right]), 1.0, (left, top))
+
+    def found(self, results, width, height):
+        # Remember a box around every code found, plus a margin, for the next frame
+        xs = [x for result in results for x, _ in result.polygon]
+        ys = [y for result in results for _, y in result.polygon]
+        self.last_region = self.clip(
+            (min(xs) - self.margin, min(ys) - self.margin,
+             max(xs) - min(xs) + 2 * self.margin, max(ys) - min(ys) + 2 * self.margin),
+            width, height,
+        )
+        self.misses = 0
+        return results
+
+    @staticmethod
+    def clip(rect, width, height):
+        # (x, y, w, h) -> (left, top, right, bottom) kept inside the frame
+        x, y, w, h = rect
+        return max(0, x), max(0, y), min(width, x + w), min(height, y + h)
+
+
+class CameraStats:
+    # Counters for one camera. Written by its worker threads, read by the GUI once a second.
+    def __init__(self):
+        self.captured = 0       # Frames read from the source
+        self.decoded = 0        # Frames that went through the decoder
+        self.codes = 0          # Codes found
+        self.started = time.monotonic()
+
+    def summary(self, dropped):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (f"{self.captured / elapsed:.1f} fps captured, {self.decoded / elapsed:.1f} fps decoded, "
+                f"{self.codes} codes, {dropped} frames dropped")
+
+
+class CameraChannel:
+    # Everything that belongs to one camera: its source, queues, counters and threads
+    def __init__(self, number, source, decoder):
+        self.number = number
+        self.source = source
+        self.decoder = copy.copy(decoder)       # RegionDecoder remembers where this camera last saw a code
+        self.decode_queue = LatestQueue(2)      # Decode stage may lag a frame behind
+        self.display_queue = LatestQueue(1)     # The preview only ever needs the newest frame
+        self.stats = CameraStats()
+
+
+class ScannerPipeline(QObject):
+    frame_scanned = pyqtSignal(int, list)   # camera number, list of ScanResult (only sent when codes were found)
+    capture_failed = pyqtSignal(int, str)   # camera number, error message
+
+    def __init__(self, sources=None, decoder=decode_frame, processes=0):
+        # sources - frame sources, one per camera (default: webcam 0)
+        # decoder - decode_frame or a RegionDecoder, every camera gets its own copy
+        # processes - size of the shared decoder process pool (at most one per camera is used), 0 decodes on the threads
+        super().__init__()
+        sources = sources or [CameraSource(0, 640, 480)]
+        self.channels = [CameraChannel(number, source, decoder) for number, source in enumerate(sources)]
+        self.processes = processes
+        self.pool = None
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self.stop_event.clear()
+        if self.processes:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # "spawn" starts clean processes, forking a process that runs Qt threads is not safe
+            workers = min(self.processes, len(self.channels))    # Each camera waits for its frame before sending the next
+            self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        self.threads = []
+        for channel in self.channels:
+            channel.stats = CameraStats()
+            self.threads.append(threading.Thread(target=self.capture_loop, args=(channel,),
+                                                 name=f"scanner-capture-{channel.number}", daemon=True))
+            self.threads.append(threading.Thread(target=self.decode_loop, args=(channel,),
+                                                 name=f"scanner-decode-{channel.number}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()                       # Each loop wakes up within its queue timeout
+        self.threads = []
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def latest_frame(self, number):
+        # Newest frame of one camera for the preview, or None if there is no new frame (never waits)
+        return self.channels[number].display_queue.get(timeout=0)
+
+    def stats(self):
+        # One line of statistics per camera
+        return [channel.stats.summary(channel.decode_queue.dropped) for channel in self.channels]
+
+    def capture_loop(self, channel):
+        try:
+            load_libraries()                     # A missing OpenCV or zbar is reported before the camera opens
+            channel.source.open()                # Opening the camera can be slow, so it happens here
+            while not self.stop_event.is_set():
+                success, frame = channel.source.read()   # Blocks until the camera has a new frame
+                if not success:
+                    self.capture_failed.emit(channel.number, "Failed to capture frame.")
+                    break
+                channel.stats.captured += 1
+                channel.decode_queue.put(frame)
+                channel.display_queue.put(frame)
+        except Exception as error:
+            self.capture_failed.emit(channel.number, str(error))
+        finally:
+            channel.source.release()             # Release the camera
+
+    def decode_loop(self, channel):
+        while not self.stop_event.is_set():
+            frame = channel.decode_queue.get(timeout=0.1)
+            if frame is None:
+                continue
+            try:
+                if self.pool:
+                    # The worker process does the decoding; this thread just waits without holding the GIL.
+                    # Gray frames are a third of the data to send, and both decoders accept them.
+                    future = self.pool.submit(decode_in_process, channel.decoder, to_gray(frame))
+                    results, channel.decoder = future.result()
+                else:
+                    results = channel.decoder(frame)
+            except Exception as error:
+                self.capture_failed.emit(channel.number, f"Decoding failed: {error}")
+                break
+            channel.stats.decoded += 1
+            if results:
+                channel.stats.codes += len(results)
+                self.frame_scanned.emit(channel.number, results)   # Duplicates are filtered by the app
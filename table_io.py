@@ -0,0 +1,328 @@
+'''
+Background CSV export and import for the Intermediate PyQt5 GUI.
+
+Writing a big table on the GUI thread freezes the window. Here the table is
+copied into a TableSnapshot, then a QRunnable on the QThreadPool streams it
+to disk in chunks. The data goes to a temporary file first and is renamed
+over the real file only when everything was written, so a cancelled or
+crashed save never leaves a half-written CSV behind.
+
+Importing works the other way around: a worker reads the CSV as a stream,
+parses and checks the rows, and hands them to the GUI thread in large
+batches that the model inserts with a single beginInsertRows call.
+
+BatchEntryTask does the same for the Batch Add dialog: pasted text and
+dropped files are checked on a worker against the same rules as a single
+Submit (see person_validation.py), and come back as one batch together with
+the lines that could not be used. Dropped .pqts snapshots are read with
+SnapshotReader, and a file that can't be read at all is reported as one
+problem instead of failing the batch. An email may only appear once per
+batch; the window checks the batch against the emails already in the table.
+'''
+import contextlib
+import csv
+import os
+import tempfile
+import threading
+from array import array
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from person_table import HEADERS, LANGUAGE_CODES, TableSnapshot, build_segment, text_to_dob
+from person_validation import check_name, check_email
+
+'''
+contextlib - turns atomic_file() into a with-block
+csv - standard Python module for reading from and writing to CSV files
+os - used for fsync and the atomic os.replace rename
+tempfile - creates the temporary file next to the real one
+threading - threading.Event is a thread-safe flag used for cancelling
+array - compact typed arrays, used for the birthday column of each batch
+QObject - base class needed to define signals
+QRunnable - a task that QThreadPool runs on a worker thread
+pyqtSignal - defines signals, emitting from a worker thread queues them to the GUI thread
+check_name / check_email - the input rules of the Submit button, also applied to Batch Add lines
+'''
+
+
+EXPORT_CHUNK_ROWS = 5000    # Rows handed to writerows at a time
+IMPORT_BATCH_ROWS = 20000   # Rows parsed before a batch is sent to the GUI thread
+REMOTE_VALUES = {"Yes": 1, "No": 0}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def atomic_file(filename, mode='w', **options):
+    # Yields a temporary file next to filename (options go to open()). When the with-block finishes it is
+    # renamed over filename; if the block raises, it is deleted and filename stays untouched.
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(filename), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode=mode, **options) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())                  # Make sure the data is on disk before the rename
+        keep_file_mode(filename, temp_name)
+        os.replace(temp_name, filename)              # Atomic: readers see either the old or the new file
+    except BaseException:
+        os.unlink(temp_name)                         # Throw away the partial file
+        raise
+
+
+def write_csv_atomic(filename, snapshot, chunk_rows=EXPORT_CHUNK_ROWS, progress=None, cancel_event=None):
+    # 'newline=""' prevents extra blank lines between rows on some systems.
+    # 'encoding="utf-8"' ensures proper handling of non-English characters.
+    with atomic_file(filename, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADERS)
+
+        total = len(snapshot)
+        for start in range(0, total, chunk_rows):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            stop = min(start + chunk_rows, total)
+            writer.writerows(snapshot.rows(start, stop))    # One call per chunk instead of one per row
+            if progress is not None:
+                progress(stop, total)
+
+
+def keep_file_mode(filename, temp_name):
+    # mkstemp creates private (0600) files; give the new file the permissions of the one it replaces
+    try:
+        mode = os.stat(filename).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    os.chmod(temp_name, mode)
+
+
+class ExportSignals(QObject):
+    progress = pyqtSignal(int, int)     # rows written, total rows
+    finished = pyqtSignal(str)          # filename
+    failed = pyqtSignal(str)            # error message
+    cancelled = pyqtSignal()
+
+
+class CsvExportTask(QRunnable):
+    def __init__(self, filename, snapshot, chunk_rows=EXPORT_CHUNK_ROWS):
+        super().__init__()
+        self.filename = filename
+        self.snapshot = snapshot
+        self.chunk_rows = chunk_rows
+        self.signals = ExportSignals()           # Created on the GUI thread, so its slots run there
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()                  # Checked by the worker between chunks
+
+    def run(self):
+        try:
+            write_csv_atomic(self.filename, self.snapshot, self.chunk_rows,
+                             self.signals.progress.emit, self.cancel_event)
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(self.filename)
+
+
+class RowParser:
+    # Turns CSV text rows into column values. Birthdays repeat a lot, so parsed dates are cached.
+    def __init__(self):
+        self.dob_cache = {}
+
+    def parse(self, values):
+        # Returns (name, email, dob, remote, language) or None if the row is not valid
+        if len(values) != len(HEADERS):
+            return None
+        name, email, birthday, remote, language = (value.strip() for value in values)
+        dob = self.dob_cache.get(birthday)
+        if dob is None:
+            dob = text_to_dob(birthday) if birthday else 0     # An empty birthday is a row with no date
+            if dob is None:
+                return None
+            self.dob_cache[birthday] = dob
+        remote_flag = REMOTE_VALUES.get(remote)
+        language_code = LANGUAGE_CODES.get(language)
+        if not (name and email) or remote_flag is None or language_code is None:
+            return None
+        return name, email, dob, remote_flag, language_code
+
+    def parse_entry(self, values):
+        # Like parse(), but Remote and Language may be left out (they default to No and English)
+        if not 3 <= len(values) <= len(HEADERS) or not values[2].strip():
+            return None                                         # A typed entry has to give a birthday
+        return self.parse(values + ["No", "English"][len(values) - 3:])
+
+
+class ColumnBatch:
+    # Collects parsed rows column by column, then becomes a TableSnapshot for the model
+    def __init__(self):
+        self.names, self.emails, self.dobs = [], [], array("i")
+        self.remote, self.languages = bytearray(), bytearray()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, email, dob, remote, language):
+        self.names.append(name)
+        self.emails.append(email)
+        self.dobs.append(dob)
+        self.remote.append(remote)
+        self.languages.append(language)
+
+    def to_snapshot(self, first_row=0):
+        # first_row - the table row the batch is expected to start at, see build_segment
+        snapshot = TableSnapshot(self.names, self.emails, self.dobs, bytes(self.remote), bytes(self.languages))
+        snapshot.search_segment = build_segment(self.names, self.emails, first_row)   # Index the batch here, not on the GUI thread
+        return snapshot
+
+
+def read_csv_batches(filename, batch_rows=IMPORT_BATCH_ROWS, cancel_event=None, first_row=0):
+    # Generator: yields (TableSnapshot, skipped rows so far) every batch_rows valid rows.
+    # first_row - rows already in the table, the batches are indexed as if they follow them
+    parser = RowParser()
+    batch = ColumnBatch()
+    skipped = 0
+    with open(filename, mode='r', newline='', encoding='utf-8') as file:
+        for values in csv.reader(file):          # csv.reader streams the file, it is never loaded whole
+            if values == HEADERS:
+                continue                         # Header row
+            parsed = parser.parse(values)
+            if parsed is None:
+                skipped += 1
+                continue
+            batch.add(*parsed)
+            if len(batch) >= batch_rows:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ImportCancelled()
+                yield batch.to_snapshot(first_row), skipped
+                first_row += len(batch)
+                batch = ColumnBatch()
+    if len(batch):
+        yield batch.to_snapshot(first_row), skipped
+    elif skipped:
+        yield ColumnBatch().to_snapshot(), skipped   # Still report rows that were skipped
+
+
+class ImportSignals(QObject):
+    batch_ready = pyqtSignal(object)    # TableSnapshot with the next rows to add
+    finished = pyqtSignal(int, int)     # rows loaded, rows skipped
+    failed = pyqtSignal(str)            # error message
+    cancelled = pyqtSignal()
+
+
+class CsvImportTask(QRunnable):
+    def __init__(self, filename, batch_rows=IMPORT_BATCH_ROWS, first_row=0):
+        super().__init__()
+        self.filename = filename
+        self.batch_rows = batch_rows
+        self.first_row = first_row               # Rows in the table when the import starts
+        self.signals = ImportSignals()           # Created on the GUI thread, so its slots run there
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        loaded = skipped = 0
+        try:
+            for batch, skipped in read_csv_batches(self.filename, self.batch_rows, self.cancel_event, self.first_row):
+                loaded += len(batch)
+                self.signals.batch_ready.emit(batch)
+        except ImportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(loaded, skipped)
+
+
+def entry_rows(lines):
+    # Split typed or pasted lines into fields. A line with a tab is tab-separated, otherwise comma-separated.
+    for line in lines:
+        if not line.strip():
+            yield None
+            continue
+        yield next(csv.reader([line], delimiter="\t" if "\t" in line else ","))
+
+
+def text_entries(source_name, lines, parser):
+    # (where, parsed row or None) for every line of pasted text or a dropped CSV file
+    for number, (line, values) in enumerate(zip(lines, entry_rows(lines)), start=1):
+        if values is None or values == HEADERS:
+            continue                            # Empty line or header row
+        yield f"{source_name} line {number}: {line.strip()}", parser.parse_entry(values)
+
+
+def snapshot_entries(filename):
+    # (where, row) for every row of a dropped .pqts snapshot
+    from table_snapshot import SnapshotReader   # Imported here, table_snapshot imports this module
+    with SnapshotReader(filename) as reader:
+        table = reader.to_snapshot(0, len(reader))
+    source_name = os.path.basename(filename)
+    return [(f"{source_name} row {row + 1}: {table.names[row]}, {table.emails[row]}",
+             (table.names[row], table.emails[row], table.dobs[row], table.remote[row], table.languages[row]))
+            for row in range(len(table))]
+
+
+class BatchSignals(QObject):
+    finished = pyqtSignal(object, list, list)   # TableSnapshot of the valid rows, "line N: text" problems, "line N: text" per row
+    failed = pyqtSignal(str)                # error message
+
+
+class BatchEntryTask(QRunnable):
+    def __init__(self, text="", filenames=(), first_row=0):
+        super().__init__()
+        self.text = text
+        self.filenames = list(filenames)
+        self.first_row = first_row               # Rows in the table when the check starts
+        self.signals = BatchSignals()           # Created on the GUI thread, so its slots run there
+
+    def run(self):
+        parser = RowParser()
+        batch = ColumnBatch()
+        problems = []
+        lines_used = []                         # Where each row of the batch came from, for problems found later
+        emails = set()                          # Lowercase emails in the batch so far
+        try:
+            for entries in self.sources(parser, problems):
+                for where, parsed in entries:
+                    if parsed is None:
+                        problems.append(where)
+                        continue
+                    name, email = parsed[0], parsed[1]
+                    message = check_name(name) or check_email(email)
+                    if message is None and email.casefold() in emails:
+                        message = f"{email} is on an earlier line."
+                    if message:
+                        problems.append(f"{where} - {message}")
+                    else:
+                        emails.add(email.casefold())
+                        batch.add(*parsed)
+                        lines_used.append(where)
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(batch.to_snapshot(self.first_row), problems, lines_used)
+
+    def sources(self, parser, problems):
+        # Entries of the pasted text, then of each dropped file in turn
+        if self.text.strip():
+            yield text_entries("pasted text", self.text.splitlines(), parser)
+        for filename in self.filenames:
+            try:
+                if filename.lower().endswith(".pqts"):
+                    entries = snapshot_entries(filename)
+                else:
+                    with open(filename, mode='r', newline='', encoding='utf-8') as file:
+                        entries = text_entries(os.path.basename(filename), file.read().splitlines(), parser)
+            except (OSError, ValueError) as error:  # Includes UnicodeDecodeError and a damaged snapshot
+                problems.append(f"{os.path.basename(filename)} - could not be read: {error}")
+                continue
+            yield entries
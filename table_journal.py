@@ -0,0 +1,188 @@
+'''
+Autosave journal for the Intermediate PyQt5 GUI.
+
+Rewriting the whole CSV on every save costs time proportional to the table.
+Instead, every change (a new person, a ticked Remote box, a new language)
+is appended to a small journal file as one JSON line. A background thread
+writes the new lines to disk every second, so after a crash at most the
+last second of edits is lost.
+
+Now and then the app "compacts" the journal: it saves the table as the
+usual CSV snapshot and starts an empty journal. On startup the CSV is
+loaded and the journal is replayed on top of it.
+
+Compacting step by step:
+    1. rotate(): the current journal is renamed to <journal>.compacting and a new, empty one is started
+    2. the table is saved to the CSV on a worker (atomic, see table_io.py)
+    3. compaction_done(): <journal>.compacting is deleted
+If the app dies between 1 and 3, both files are replayed on the next start.
+Replaying is safe to repeat: each entry carries its row number, rows that
+are already in the table are skipped and flag/language values are simply set.
+
+Imported rows are too many to journal one by one; only the next snapshot
+saves them. The journal gets an "import" entry with their first row and
+count, so if the app dies before that snapshot, replay knows those rows are
+gone: it skips the entries that changed them and moves the row numbers of
+later entries down to match the table that was actually saved.
+'''
+import json
+import os
+import threading
+
+'''
+json - each journal entry is a JSON list on its own line
+os - file renames and fsync
+threading - the background flush thread and a lock around the pending lines
+'''
+
+
+FLUSH_SECONDS = 1.0         # How often the background thread writes pending entries
+
+
+class TableJournal:
+    def __init__(self, path="table_data.journal", flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.compacting_path = path + ".compacting"
+        self.flush_seconds = flush_seconds
+        self.pending = []                       # JSON lines not written yet
+        self.entries = 0                        # Entries since the last compaction (including ones on disk)
+        self.lock = threading.Lock()            # Guards pending and the file
+        self.file = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.file = open(self.path, mode='a', encoding='utf-8')
+        if self.file.tell() and not self.ends_with_newline():
+            self.file.write("\n")              # Don't glue new entries onto a half-written line from a crash
+        self.thread = threading.Thread(target=self.flush_loop, name="table-journal", daemon=True)
+        self.thread.start()
+
+    def ends_with_newline(self):
+        with open(self.path, mode='rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    # --- Recording changes (GUI thread) ---
+
+    def record_add(self, row, name, email, dob, remote=0, language=0):
+        self.record(["add", row, name, email, dob, remote, language])
+
+    def record_remote(self, row, remote):
+        self.record(["remote", row, remote])
+
+    def record_language(self, row, language):
+        self.record(["language", row, language])
+
+    def record_import(self, row, count):
+        self.record(["import", row, count])    # The rows themselves are only saved by the next snapshot
+
+    def record(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.pending.append(line)
+            self.entries += 1
+
+    # --- Writing (background thread) ---
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending or self.file is None:
+                return
+            self.file.writelines(self.pending)  # Cost depends only on the new entries
+            self.pending.clear()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    # --- Compaction ---
+
+    def rotate(self):
+        # Step 1: call at the same moment the table snapshot is taken, on the GUI thread
+        self.flush()
+        with self.lock:
+            self.file.close()
+            if os.path.exists(self.compacting_path):
+                # An earlier compaction did not finish; keep its entries and add the new ones after them
+                with open(self.path, mode='r', encoding='utf-8') as current, \
+                        open(self.compacting_path, mode='a', encoding='utf-8') as older:
+                    older.write(current.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.compacting_path)
+            self.file = open(self.path, mode='a', encoding='utf-8')
+            self.entries = 0
+
+    def compaction_done(self):
+        # Step 3: the CSV now holds everything that was in the rotated journal
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+    # --- Replay (startup) ---
+
+    def read_entries(self):
+        # Entries from an unfinished compaction first, then the current journal
+        entries = []
+        for path in (self.compacting_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, mode='r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue                # Half-written line from a crash
+        with self.lock:
+            self.entries += len(entries)
+        return entries
+
+
+def replay(model, entries):
+    # Apply journal entries to a PersonTableModel; returns how many changed something
+    applied = 0
+    lost = []                                   # (first row, count) of imports no snapshot saved, in journal row numbers
+    for entry in entries:
+        kind, row = entry[0], table_row(entry[1], lost)
+        if row is None:
+            continue                            # Changes a row that was lost with its import
+        if kind == "import":
+            if row + entry[2] > model.rowCount():
+                lost.append((entry[1], entry[2]))
+            continue
+        if kind == "add":
+            if row < model.rowCount():
+                continue                        # Already in the CSV snapshot
+            model.append_row(*entry[2:])
+        elif kind == "remote" and row < model.rowCount():
+            model.set_remote(row, entry[2])
+        elif kind == "language" and row < model.rowCount():
+            model.set_language(row, entry[2])
+        else:
+            continue
+        applied += 1
+    return applied
+
+
+def table_row(row, lost):
+    # Journal row number -> row in the replayed table, or None if the row was lost
+    shift = 0
+    for first, count in lost:
+        if row >= first + count:
+            shift += count
+        elif row >= first:
+            return None
+    return row - shift
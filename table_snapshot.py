@@ -0,0 +1,287 @@
+'''
+Binary table snapshots (.pqts files) for the Intermediate PyQt5 GUI.
+
+A CSV file turns every value into text: every birthday is parsed again on
+load and "Yes"/"No" and the language names are repeated on every row. A
+snapshot stores each column on its own, in the form the model already
+keeps it in memory:
+
+    header          b"PQTS", format version, row count, then (offset, length) of every section below
+    language names  the language dictionary, one name per line
+    languages       1 byte per row, the position of the row's language in the dictionary
+    remote          1 bit per row, 8 rows packed into each byte
+    dobs            int32 per row, the birthday as a day number (QDate Julian day, 0 = no date)
+    name offsets    int64 per row plus one, where each name starts in the names section
+    names           all names as UTF-8, one after the other
+    email offsets / emails - the same for the emails
+All numbers are little-endian and every section starts on an 8-byte boundary.
+
+SnapshotReader maps the file into memory (mmap) and looks at each section
+through a memoryview cast to the right type, without copying. Opening a
+snapshot of any size is instant; the operating system only reads the pages
+that are actually used. Snapshots are written to a temporary file and
+renamed at the end, like the CSV (see table_io.py).
+'''
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from itertools import accumulate
+from PyQt5.QtCore import QRunnable
+from person_table import LANGUAGES, LANGUAGE_CODES, TableSnapshot, build_segment
+from table_io import ExportSignals, ImportSignals, ExportCancelled, ImportCancelled, atomic_file, IMPORT_BATCH_ROWS
+
+'''
+mmap - maps the snapshot file into memory, so reading it needs no read() calls or copies
+struct - packs and unpacks the fixed-size header
+sys - sys.byteorder, the columns are stored little-endian
+threading - threading.Event is a thread-safe flag used for cancelling
+array - compact typed arrays for the birthdays and the string offsets
+accumulate - running total of the string lengths gives the offsets
+QRunnable - a task that QThreadPool runs on a worker thread
+ExportSignals / ImportSignals - the same signals as the CSV tasks, so the window handles both alike
+'''
+
+
+MAGIC = b"PQTS"
+VERSION = 1
+SECTIONS = ["language_names", "languages", "remote", "dobs", "name_offsets", "names", "email_offsets", "emails"]
+HEADER = struct.Struct("<4sHHQ" + "QQ" * len(SECTIONS))     # magic, version, section count, rows, (offset, length) pairs
+ALIGNMENT = 8
+TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")       # Remote flags as the characters "0" and "1"
+FROM_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def pack_bits(flags):
+    # b"\x01\x00\x01..." -> one bit per flag, the first flag in the lowest bit of the first byte
+    if not flags:
+        return b""
+    number = int(bytes(flags).translate(TO_DIGITS)[::-1], 2)        # Python does this in C, no loop per row
+    return number.to_bytes((len(flags) + 7) // 8, "little")
+
+
+def unpack_bits(packed, start, count):
+    # The opposite of pack_bits for flags start..start+count, packed must begin at the byte holding flag `start`
+    if count <= 0:
+        return b""
+    number = int.from_bytes(packed, "little")
+    digits = format(number, "0%db" % (len(packed) * 8))[::-1]
+    first = start % 8
+    return digits[first:first + count].encode("ascii").translate(FROM_DIGITS)
+
+
+def little_endian(values):
+    # The bytes of an array in little-endian order, without a copy on little-endian machines
+    if sys.byteorder == "little":
+        return memoryview(values).cast("B")
+    values = array(values.typecode, values)
+    values.byteswap()
+    return values.tobytes()
+
+
+def encode_strings(values):
+    # Returns (offsets, blob): value i is blob[offsets[i]:offsets[i + 1]]
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = array("q", [0])
+    offsets.extend(accumulate(map(len, encoded)))
+    return offsets, b"".join(encoded)
+
+
+def write_snapshot_atomic(filename, snapshot, cancel_event=None):
+    name_offsets, names = encode_strings(snapshot.names)
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExportCancelled()
+    email_offsets, emails = encode_strings(snapshot.emails)
+    sections = [
+        "\n".join(LANGUAGES).encode("utf-8"),
+        bytes(snapshot.languages),                  # Codes are already positions in LANGUAGES
+        pack_bits(snapshot.remote),
+        little_endian(array("i", snapshot.dobs)),
+        little_endian(name_offsets),
+        names,
+        little_endian(email_offsets),
+        emails,
+    ]
+
+    # Work out where every section goes, then write header and sections in one pass
+    places = []
+    offset = aligned(HEADER.size)
+    for section in sections:
+        places += [offset, len(section)]
+        offset = aligned(offset + len(section))
+    header = HEADER.pack(MAGIC, VERSION, len(SECTIONS), len(snapshot), *places)
+
+    with atomic_file(filename, mode='wb') as file:             # Temporary file, renamed at the end (see table_io.py)
+        file.write(header)
+        for section, start in zip(sections, places[::2]):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            file.write(b"\0" * (start - file.tell()))       # Padding up to the 8-byte boundary
+            file.write(section)
+
+
+class SnapshotReader:
+    # Read-only view of a snapshot file. Use it in a with-block, or call close() when done.
+    def __init__(self, filename):
+        self.file = open(filename, mode='rb')
+        self.map = None
+        self.views = []                 # Every memoryview into the map, released again by close()
+        try:
+            self.open_map()
+        except BaseException:
+            self.close()
+            raise
+
+    def open_map(self):
+        size = os.fstat(self.file.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError("Not a table snapshot (file too short)")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, section_count, self.row_count, *places = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError("Not a table snapshot")
+        if version != VERSION or section_count != len(SECTIONS):
+            raise ValueError(f"Unsupported table snapshot version {version}")
+
+        buffer = self.view(memoryview(self.map))
+        sections = {}
+        for name, offset, length in zip(SECTIONS, places[::2], places[1::2]):
+            if offset + length > size:
+                raise ValueError(f"Table snapshot is cut off (section {name})")
+            sections[name] = self.view(buffer[offset:offset + length])
+
+        rows = self.row_count
+        self.languages = sections["languages"]                          # 1 byte per row
+        self.remote = sections["remote"]                                # Packed bits
+        self.dobs = self.typed(sections["dobs"], "i")
+        self.name_offsets = self.typed(sections["name_offsets"], "q")
+        self.names = sections["names"]
+        self.email_offsets = self.typed(sections["email_offsets"], "q")
+        self.emails = sections["emails"]
+        if (len(self.languages) != rows or len(self.remote) != (rows + 7) // 8 or len(self.dobs) != rows
+                or len(self.name_offsets) != rows + 1 or len(self.email_offsets) != rows + 1):
+            raise ValueError("Table snapshot columns don't match its row count")
+
+        # Codes in the file are positions in the file's dictionary, turn them into this app's codes
+        names = bytes(sections["language_names"]).decode("utf-8").split("\n")
+        if any(name not in LANGUAGE_CODES for name in names):
+            raise ValueError("Table snapshot uses a language this app doesn't know")
+        self.language_map = bytes(LANGUAGE_CODES[name] for name in names).ljust(256, b"\0")
+
+    def view(self, view):
+        self.views.append(view)
+        return view
+
+    def typed(self, section, typecode):
+        if sys.byteorder == "little":
+            return self.view(section.cast(typecode))        # Zero copy, straight from the mapped file
+        values = array(typecode, bytes(section))
+        values.byteswap()
+        return values
+
+    def __len__(self):
+        return self.row_count
+
+    def name(self, row):
+        return str(self.names[self.name_offsets[row]:self.name_offsets[row + 1]], "utf-8")
+
+    def email(self, row):
+        return str(self.emails[self.email_offsets[row]:self.email_offsets[row + 1]], "utf-8")
+
+    def to_snapshot(self, start, stop):
+        # Rows start..stop as a TableSnapshot, ready for PersonTableModel.append_columns
+        names = self.strings(self.name_offsets, self.names, start, stop)
+        emails = self.strings(self.email_offsets, self.emails, start, stop)
+        dobs = array("i")
+        dobs.frombytes(memoryview(self.dobs[start:stop]).cast("B"))     # One copy of the raw bytes
+        remote = unpack_bits(self.remote[start // 8:(stop + 7) // 8], start, stop - start)
+        languages = bytes(self.languages[start:stop]).translate(self.language_map)
+        return TableSnapshot(names, emails, dobs, remote, languages)
+
+    @staticmethod
+    def strings(offsets, blob, start, stop):
+        positions = offsets[start:stop + 1].tolist()
+        first = positions[0]
+        data = bytes(blob[first:positions[-1]])
+        if data.isascii():
+            # One decode for the whole range; for ASCII, byte offsets are also character offsets
+            text = data.decode("ascii")
+            return [text[begin - first:end - first] for begin, end in zip(positions, positions[1:])]
+        return [data[begin - first:end - first].decode("utf-8") for begin, end in zip(positions, positions[1:])]
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()              # The map can only be closed once nothing points into it
+        self.views = []
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SnapshotExportTask(QRunnable):
+    def __init__(self, filename, snapshot):
+        super().__init__()
+        self.filename = filename
+        self.snapshot = snapshot
+        self.signals = ExportSignals()           # Created on the GUI thread, so its slots run there
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()                  # Checked by the worker between sections
+
+    def run(self):
+        try:
+            write_snapshot_atomic(self.filename, self.snapshot, self.cancel_event)
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            total = len(self.snapshot)
+            self.signals.progress.emit(total, total)
+            self.signals.finished.emit(self.filename)
+
+
+class SnapshotImportTask(QRunnable):
+    def __init__(self, filename, batch_rows=IMPORT_BATCH_ROWS, first_row=0):
+        super().__init__()
+        self.filename = filename
+        self.batch_rows = batch_rows
+        self.first_row = first_row               # Rows in the table when the import starts
+        self.signals = ImportSignals()           # Created on the GUI thread, so its slots run there
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        loaded = 0
+        try:
+            with SnapshotReader(self.filename) as reader:
+                for start in range(0, len(reader), self.batch_rows):
+                    if self.cancel_event.is_set():
+                        raise ImportCancelled()
+                    batch = reader.to_snapshot(start, min(start + self.batch_rows, len(reader)))
+                    # Index on the worker, like the CSV import
+                    batch.search_segment = build_segment(batch.names, batch.emails, self.first_row + start)
+                    loaded += len(batch)
+                    self.signals.batch_ready.emit(batch)
+        except ImportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(loaded, 0)
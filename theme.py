@@ -0,0 +1,99 @@
+'''
+Shared look for the PyQt apps.
+
+Every app used to call setStyleSheet on its own window with a big, nearly
+identical block of QSS. A stylesheet on a window is resolved again for every
+child widget, and any rule that matches a table (even a plain
+"QWidget { background-color }") makes Qt style each cell through the
+stylesheet engine on every repaint.
+
+apply_theme() sets one stylesheet on the whole application, once. It has no
+rule that matches a table: colors that were in the QSS before (page
+background, table rows, selection, grid lines) come from a QPalette
+instead, so tables are painted by the normal, fast style.
+'''
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QPalette, QColor
+
+'''
+QApplication - the theme is set once on the application, every window gets it
+QPalette - the set of colors a widget paints with (background, text, selection...)
+QColor - a color made from a "#rrggbb" string
+'''
+
+
+PAGE_COLOR = "#f7f9fc"      # Window background
+ACCENT_COLOR = "#007BFF"    # Buttons, borders, table headers and selection
+HOVER_COLOR = "#0056b3"
+GRID_COLOR = "#dcdcdc"
+ERROR_COLOR = "#dc3545"     # Border and message text of fields that fail validation
+WHITE_ROWS = ("white", "white")             # PyQt5_Table_Tutorial
+BLUE_ROWS = ("#cce0ff", "#a7c8fa")          # Intermediate: light blue base, slightly darker light blue
+
+# Nothing in here may match QTableWidget or QTableView (QWidget matches them too), see style_table()
+APP_STYLESHEET = f"""
+    QLabel {{
+        color: #003366;
+        font-size: 14px;
+    }}
+    QLineEdit, QDateEdit {{
+        border: 2px solid {ACCENT_COLOR};
+        border-radius: 5px;
+        padding: 8px;
+        font-size: 14px;
+    }}
+    QLineEdit[invalid="true"] {{
+        border-color: {ERROR_COLOR};
+        background-color: #fff5f5;
+    }}
+    QLabel#error_label {{
+        color: {ERROR_COLOR};
+    }}
+    QPushButton {{
+        background-color: {ACCENT_COLOR};
+        color: white;
+        border: none;
+        border-radius: 5px;
+        padding: 10px;
+        font-size: 14px;
+    }}
+    QPushButton:hover {{
+        background-color: {HOVER_COLOR};
+    }}
+    QHeaderView::section {{
+        background-color: {ACCENT_COLOR};
+        color: white;
+        padding: 5px;
+        border: none;
+        font-weight: bold;
+    }}
+"""
+
+
+def apply_theme(app=None):
+    # Safe to call from every window's __init__, only the first call does anything
+    app = app or QApplication.instance()
+    if app.property("theme_applied"):
+        return
+    palette = app.palette()
+    palette.setColor(QPalette.Window, QColor(PAGE_COLOR))
+    palette.setColor(QPalette.Base, QColor(PAGE_COLOR))
+    palette.setColor(QPalette.Highlight, QColor(ACCENT_COLOR))
+    palette.setColor(QPalette.HighlightedText, QColor("white"))
+    app.setPalette(palette)
+    app.setStyleSheet(APP_STYLESHEET)
+    app.setProperty("theme_applied", True)
+
+
+def style_table(table, rows=WHITE_ROWS):
+    # Table colors and font through the palette, so cells skip the stylesheet engine when painted
+    palette = table.palette()
+    palette.setColor(QPalette.Base, QColor(rows[0]))
+    palette.setColor(QPalette.AlternateBase, QColor(rows[1]))
+    palette.setColor(QPalette.Highlight, QColor(ACCENT_COLOR))
+    palette.setColor(QPalette.HighlightedText, QColor("white"))
+    palette.setColor(QPalette.Mid, QColor(GRID_COLOR))     # Qt draws the grid lines in the Mid color
+    table.setPalette(palette)
+    font = table.font()
+    font.setPixelSize(14)
+    table.setFont(font)